@@ -2,14 +2,16 @@
 
 from __future__ import annotations
 
+import sys
 from dataclasses import dataclass
-from typing import Iterable
+from functools import lru_cache
+from typing import Iterable, Iterator, List, NamedTuple, Tuple, Union
 
-from .models import EditorProfile, PendingPage, PendingRevision
+from .models import EditorProfile, PendingPage, PendingRevision, WikiConfiguration
+from .services import fold_name, prefetch_revision_wikitext
 
 
-@dataclass(frozen=True)
-class AutoreviewDecision:
+class AutoreviewDecision(NamedTuple):
     """Represents the aggregated outcome for a revision."""
 
     status: str
@@ -17,261 +19,472 @@ class AutoreviewDecision:
     reason: str
 
 
-def run_autoreview_for_page(page: PendingPage) -> list[dict]:
-    """Run the configured autoreview checks for each pending revision of a page."""
+class CheckResult(NamedTuple):
+    """Outcome of a single autoreview check for a revision."""
+
+    id: str
+    title: str
+    status: str
+    message: str
+
 
+@dataclass(frozen=True)
+class NormalizedLookup:
+    """Casefolded configuration values mapped back to their configured spelling."""
+
+    keys: frozenset[str]
+    names: dict[str, str]
+
+
+_DECISION_BOT_APPROVE = AutoreviewDecision(
+    status="approve",
+    label="Would be auto-approved",
+    reason="The user is recognized as a bot.",
+)
+_DECISION_GROUP_APPROVE = AutoreviewDecision(
+    status="approve",
+    label="Would be auto-approved",
+    reason="The user belongs to groups that are auto-approved.",
+)
+_DECISION_DEFAULT_RIGHTS_APPROVE = AutoreviewDecision(
+    status="approve",
+    label="Would be auto-approved",
+    reason="The user has default rights that allow auto-approval.",
+)
+_DECISION_BLOCKED = AutoreviewDecision(
+    status="blocked",
+    label="Cannot be auto-approved",
+    reason="The earlier version of the article is in blocking categories.",
+)
+_DECISION_MANUAL = AutoreviewDecision(
+    status="manual",
+    label="Requires human review",
+    reason="In dry-run mode the edit would not be approved automatically.",
+)
+
+
+# Checks with a fixed message are shared; the others get their message per
+# revision through ``_replace``.
+_CHECK_BOT_OK = CheckResult(
+    id="bot-user",
+    title="Bot user",
+    status="ok",
+    message="The edit could be auto-approved because the user is a bot.",
+)
+_CHECK_BOT_NOT_OK = CheckResult(
+    id="bot-user",
+    title="Bot user",
+    status="not_ok",
+    message="The user is not marked as a bot.",
+)
+_CHECK_GROUP_OK = CheckResult(
+    id="auto-approved-group",
+    title="Auto-approved groups",
+    status="ok",
+    message="",
+)
+_CHECK_GROUP_NOT_MEMBER = CheckResult(
+    id="auto-approved-group",
+    title="Auto-approved groups",
+    status="not_ok",
+    message="The user does not belong to auto-approved groups.",
+)
+_CHECK_GROUP_NO_DEFAULT_RIGHTS = CheckResult(
+    id="auto-approved-group",
+    title="Auto-approved groups",
+    status="not_ok",
+    message="The user does not have default auto-approval rights.",
+)
+_CHECK_BLOCKING_FAIL = CheckResult(
+    id="blocking-categories",
+    title="Blocking categories",
+    status="fail",
+    message="",
+)
+_CHECK_BLOCKING_OK = CheckResult(
+    id="blocking-categories",
+    title="Blocking categories",
+    status="ok",
+    message="The previous version is not in blocking categories.",
+)
+
+_NO_GROUPS: frozenset[str] = frozenset()
+
+# Shared results for outcomes that never vary; callers only read them.
+_BOT_RESULT = {
+    "tests": (_CHECK_BOT_OK,),
+    "decision": _DECISION_BOT_APPROVE,
+}
+_UNCONFIGURED_MANUAL_RESULT = {
+    "tests": (_CHECK_BOT_NOT_OK, _CHECK_GROUP_NO_DEFAULT_RIGHTS, _CHECK_BLOCKING_OK),
+    "decision": _DECISION_MANUAL,
+}
+
+
+def run_autoreview_for_page(
+    page: PendingPage, configuration: WikiConfiguration | None = None
+) -> Iterator[dict]:
+    """Run the configured autoreview checks for each pending revision of a page.
+
+    Results are yielded oldest revision first. Pass the wiki's ``configuration``
+    when it is already loaded to avoid fetching it again.
+    """
+
+    if configuration is None:
+        configuration = WikiConfiguration.objects.get(wiki_id=page.wiki_id)
+    # Loaded in full rather than streamed: the checks save fetched wikitext and
+    # categories on the same connection while the revisions are evaluated.
     revisions = list(
         page.revisions.exclude(revid=page.stable_revid)
+        .for_autoreview(configuration)
+        .select_related("page__wiki")
         .order_by("timestamp", "revid")
-    )  # Oldest revision first.
-    usernames = {revision.user_name for revision in revisions if revision.user_name}
-    profiles = {
+    )
+    profiles = load_editor_profiles(
+        page.wiki_id, {revision.user_name for revision in revisions if revision.user_name}
+    )
+    yield from _evaluate_revisions(revisions, profiles, configuration)
+
+
+def run_autoreview_for_pages(
+    pages: Iterable[PendingPage],
+    profiles_by_username: dict[str, EditorProfile],
+    configuration: WikiConfiguration,
+) -> dict[int, list[dict]]:
+    """Run the autoreview checks for several pages of the same wiki at once.
+
+    The pages must have their ``revisions`` prefetched oldest first, and
+    ``profiles_by_username`` must cover their editors, so that no further
+    queries are issued per page.
+    """
+
+    staged_by_page = [
+        (
+            page,
+            _stage_revisions(
+                [
+                    revision
+                    for revision in page.revisions.all()
+                    if revision.revid != page.stable_revid
+                ],
+                profiles_by_username,
+                configuration,
+            ),
+        )
+        for page in pages
+    ]
+    if configuration.blocking_categories_lookup.keys:
+        # Fetch the wikitext for all pages together rather than page by page.
+        prefetch_revision_wikitext(
+            revision
+            for _, staged in staged_by_page
+            for revision in _awaiting_blocking_check(staged)
+        )
+    return {
+        page.pageid: list(_finish_revisions(staged, configuration))
+        for page, staged in staged_by_page
+    }
+
+
+def load_editor_profiles(wiki_id: int, usernames: Iterable[str]) -> dict[str, EditorProfile]:
+    """Fetch the editor profiles of ``usernames``, keyed by username.
+
+    Only the fields read by the autoreview checks and the revision listings are
+    loaded.
+    """
+
+    return {
         profile.username: profile
         for profile in EditorProfile.objects.filter(
-            wiki=page.wiki, username__in=usernames
+            wiki_id=wiki_id, username__in=usernames
+        ).only(
+            "username",
+            "usergroups",
+            "normalized_usergroups",
+            "is_blocked",
+            "is_bot",
+            "is_autopatrolled",
+            "is_autoreviewed",
         )
     }
-    configuration = page.wiki.configuration
 
-    auto_groups = _normalize_to_lookup(configuration.auto_approved_groups)
-    blocking_categories = _normalize_to_lookup(configuration.blocking_categories)
 
-    results: list[dict] = []
+def _evaluate_revisions(
+    revisions: Iterable[PendingRevision],
+    profiles: dict[str, EditorProfile],
+    configuration: WikiConfiguration,
+) -> Iterator[dict]:
+    staged = _stage_revisions(revisions, profiles, configuration)
+    if configuration.blocking_categories_lookup.keys:
+        prefetch_revision_wikitext(_awaiting_blocking_check(staged))
+    return _finish_revisions(staged, configuration)
+
+
+# A revision paired with its result, or with the checks passed so far when it
+# still has to go through the blocking categories check.
+_StagedRevision = Tuple[PendingRevision, Union[dict, List[CheckResult]]]
+
+
+def _stage_revisions(
+    revisions: Iterable[PendingRevision],
+    profiles: dict[str, EditorProfile],
+    configuration: WikiConfiguration,
+) -> list[_StagedRevision]:
+    """Run the checks that do not need the wikitext over ``revisions``.
+
+    Bot and group approvals settle most revisions here, so only the rest need
+    their wikitext fetched for the blocking categories check.
+    """
+
+    auto_groups = configuration.auto_approved_groups_lookup
+    get_profile = profiles.get
+
+    if not auto_groups.keys and not configuration.blocking_categories_lookup.keys:
+        return [
+            (
+                revision,
+                _evaluate_without_configuration(
+                    revision, get_profile(revision.user_name or "")
+                ),
+            )
+            for revision in revisions
+        ]
+
+    # Editors usually have several revisions in a batch, so build each profile's
+    # group set once up front instead of once per revision.
+    profile_groups = (
+        {
+            username: frozenset(profile.normalized_usergroups or ())
+            for username, profile in profiles.items()
+        }
+        if auto_groups.keys
+        else {}
+    )
+
+    # Bind loop-invariant lookups once; this loop runs for every revision.
+    get_profile_groups = profile_groups.get
+    check = _identity_checks
+    staged = []
     for revision in revisions:
-        profile = profiles.get(revision.user_name or "")
-        revision_result = _evaluate_revision(
-            revision,
-            profile,
-            auto_groups=auto_groups,
-            blocking_categories=blocking_categories,
-        )
-        results.append(
-            {
-                "revid": revision.revid,
-                "tests": revision_result["tests"],
-                "decision": {
-                    "status": revision_result["decision"].status,
-                    "label": revision_result["decision"].label,
-                    "reason": revision_result["decision"].reason,
-                },
-            }
+        user_name = revision.user_name or ""
+        staged.append(
+            (
+                revision,
+                check(
+                    revision,
+                    get_profile(user_name),
+                    profile_groups=get_profile_groups(user_name, _NO_GROUPS),
+                    auto_groups=auto_groups,
+                ),
+            )
         )
+    return staged
+
+
+def _awaiting_blocking_check(staged: list[_StagedRevision]) -> Iterator[PendingRevision]:
+    return (revision for revision, outcome in staged if not isinstance(outcome, dict))
+
 
-    return results
+def _finish_revisions(
+    staged: list[_StagedRevision], configuration: WikiConfiguration
+) -> Iterator[dict]:
+    blocking_categories = configuration.blocking_categories_lookup
+    for revision, outcome in staged:
+        if not isinstance(outcome, dict):
+            outcome = _blocking_check(revision, outcome, blocking_categories)
+        yield _revision_payload(revision, outcome)
 
 
-def _evaluate_revision(
+def _revision_payload(revision: PendingRevision, revision_result: dict) -> dict:
+    decision = revision_result["decision"]
+    return {
+        "revid": revision.revid,
+        "tests": [test._asdict() for test in revision_result["tests"]],
+        "decision": {
+            "status": decision.status,
+            "label": decision.label,
+            "reason": decision.reason,
+        },
+    }
+
+
+def _evaluate_without_configuration(
+    revision: PendingRevision, profile: EditorProfile | None
+) -> dict:
+    """Evaluate a revision for a wiki without configured groups or categories.
+
+    Only the bot and default-rights checks can decide anything there; the
+    blocking-categories check always passes.
+    """
+
+    if (
+        (profile is not None and profile.is_bot)
+        or revision.rc_bot
+        or "bot" in (revision.normalized_user_groups or ())
+    ):
+        return _BOT_RESULT
+
+    default_rights_check = _default_rights_check(profile)
+    if default_rights_check is None:
+        return _UNCONFIGURED_MANUAL_RESULT
+    return {
+        "tests": (_CHECK_BOT_NOT_OK, default_rights_check),
+        "decision": _DECISION_DEFAULT_RIGHTS_APPROVE,
+    }
+
+
+def _identity_checks(
     revision: PendingRevision,
     profile: EditorProfile | None,
     *,
-    auto_groups: dict[str, str],
-    blocking_categories: dict[str, str],
-) -> dict:
-    tests: list[dict] = []
+    profile_groups: frozenset[str] | set[str],
+    auto_groups: NormalizedLookup,
+) -> dict | list[CheckResult]:
+    """Run the bot and group checks, which only look at who made the edit.
 
-    # Test 1: Bot editors can always be auto-approved.
-    if _is_bot_user(revision, profile):
-        tests.append(
-            {
-                "id": "bot-user",
-                "title": "Bot user",
-                "status": "ok",
-                "message": "The edit could be auto-approved because the user is a bot.",
-            }
-        )
-        return {
-            "tests": tests,
-            "decision": AutoreviewDecision(
-                status="approve",
-                label="Would be auto-approved",
-                reason="The user is recognized as a bot.",
-            ),
-        }
+    Returns the result when one of them approves the revision, otherwise the
+    checks so far for ``_blocking_check`` to complete.
+    """
 
-    tests.append(
-        {
-            "id": "bot-user",
-            "title": "Bot user",
-            "status": "not_ok",
-            "message": "The user is not marked as a bot.",
-        }
-    )
+    # Test 1: Bot editors can always be auto-approved. Known bot profiles are the
+    # most common exit, so they skip the revision's Superset fields entirely.
+    if profile is not None and profile.is_bot:
+        return _BOT_RESULT
+
+    tests: list[CheckResult] = []
+    # Already casefolded and de-duplicated when the revision was stored.
+    superset_groups = revision.normalized_user_groups or ()
+
+    if revision.rc_bot or "bot" in superset_groups:
+        return _BOT_RESULT
+
+    tests.append(_CHECK_BOT_NOT_OK)
 
     # Test 2: Editors in the allow-list can be auto-approved.
-    if auto_groups:
+    if auto_groups.keys:
         matched_groups = _matched_user_groups(
-            revision, profile, allowed_groups=auto_groups
+            superset_groups, profile_groups, allowed_groups=auto_groups
         )
         if matched_groups:
             tests.append(
-                {
-                    "id": "auto-approved-group",
-                    "title": "Auto-approved groups",
-                    "status": "ok",
-                    "message": "The user belongs to groups: {}.".format(
-                        ", ".join(sorted(matched_groups))
-                    ),
-                }
+                _CHECK_GROUP_OK._replace(
+                    message="The user belongs to groups: {}.".format(", ".join(matched_groups))
+                )
             )
             return {
                 "tests": tests,
-                "decision": AutoreviewDecision(
-                    status="approve",
-                    label="Would be auto-approved",
-                    reason="The user belongs to groups that are auto-approved.",
-                ),
+                "decision": _DECISION_GROUP_APPROVE,
             }
 
-        tests.append(
-            {
-                "id": "auto-approved-group",
-                "title": "Auto-approved groups",
-                "status": "not_ok",
-                "message": "The user does not belong to auto-approved groups.",
-            }
-        )
+        tests.append(_CHECK_GROUP_NOT_MEMBER)
     else:
-        if profile and (profile.is_autopatrolled or profile.is_autoreviewed):
-            default_rights: list[str] = []
-            if profile.is_autopatrolled:
-                default_rights.append("Autopatrolled")
-            if profile.is_autoreviewed:
-                default_rights.append("Autoreviewed")
-
-            tests.append(
-                {
-                    "id": "auto-approved-group",
-                    "title": "Auto-approved groups",
-                    "status": "ok",
-                    "message": "The user has default auto-approval rights: {}.".format(
-                        ", ".join(default_rights)
-                    ),
-                }
-            )
+        default_rights_check = _default_rights_check(profile)
+        if default_rights_check is not None:
+            tests.append(default_rights_check)
             return {
                 "tests": tests,
-                "decision": AutoreviewDecision(
-                    status="approve",
-                    label="Would be auto-approved",
-                    reason="The user has default rights that allow auto-approval.",
-                ),
+                "decision": _DECISION_DEFAULT_RIGHTS_APPROVE,
             }
 
-        tests.append(
-            {
-                "id": "auto-approved-group",
-                "title": "Auto-approved groups",
-                "status": "not_ok",
-                "message": "The user does not have default auto-approval rights.",
-            }
-        )
+        tests.append(_CHECK_GROUP_NO_DEFAULT_RIGHTS)
+    return tests
 
+
+def _blocking_check(
+    revision: PendingRevision,
+    tests: list[CheckResult],
+    blocking_categories: NormalizedLookup,
+) -> dict:
     # Test 3: Blocking categories on the old version prevent automatic approval.
     blocking_hits = _blocking_category_hits(revision, blocking_categories)
     if blocking_hits:
         tests.append(
-            {
-                "id": "blocking-categories",
-                "title": "Blocking categories",
-                "status": "fail",
-                "message": "The previous version belongs to blocking categories: {}.".format(
-                    ", ".join(sorted(blocking_hits))
-                ),
-            }
+            _CHECK_BLOCKING_FAIL._replace(
+                message="The previous version belongs to blocking categories: {}.".format(
+                    ", ".join(blocking_hits)
+                )
+            )
         )
         return {
             "tests": tests,
-            "decision": AutoreviewDecision(
-                status="blocked",
-                label="Cannot be auto-approved",
-                reason="The earlier version of the article is in blocking categories.",
-            ),
+            "decision": _DECISION_BLOCKED,
         }
 
-    tests.append(
-        {
-            "id": "blocking-categories",
-            "title": "Blocking categories",
-            "status": "ok",
-            "message": "The previous version is not in blocking categories.",
-        }
-    )
+    tests.append(_CHECK_BLOCKING_OK)
 
     return {
         "tests": tests,
-        "decision": AutoreviewDecision(
-            status="manual",
-            label="Requires human review",
-            reason="In dry-run mode the edit would not be approved automatically.",
-        ),
+        "decision": _DECISION_MANUAL,
     }
 
 
-def _normalize_to_lookup(values: Iterable[str] | None) -> dict[str, str]:
-    lookup: dict[str, str] = {}
-    if not values:
-        return lookup
+def _default_rights_check(profile: EditorProfile | None) -> CheckResult | None:
+    if not profile or not (profile.is_autopatrolled or profile.is_autoreviewed):
+        return None
+    default_rights: list[str] = []
+    if profile.is_autopatrolled:
+        default_rights.append("Autopatrolled")
+    if profile.is_autoreviewed:
+        default_rights.append("Autoreviewed")
+    return _CHECK_GROUP_OK._replace(
+        message="The user has default auto-approval rights: {}.".format(
+            ", ".join(default_rights)
+        )
+    )
+
+
+def build_configuration_lookup(values: Iterable[str] | None) -> NormalizedLookup:
+    """Build the casefolded lookup for a list of configured groups or categories."""
+
+    # Configurations rarely change, so identical value lists share one lookup.
+    return _normalize_to_lookup(tuple(str(value) for value in values or () if value))
+
+
+@lru_cache(maxsize=256)
+def _normalize_to_lookup(values: tuple[str, ...]) -> NormalizedLookup:
+    names: dict[str, str] = {}
     for value in values:
-        if not value:
-            continue
-        normalized = str(value).casefold()
+        normalized = fold_name(value)
         if normalized:
-            lookup[normalized] = str(value)
-    return lookup
+            names[sys.intern(normalized)] = value
+    return NormalizedLookup(keys=frozenset(names), names=names)
 
 
-def _is_bot_user(revision: PendingRevision, profile: EditorProfile | None) -> bool:
-    if profile and profile.is_bot:
-        return True
-    superset = revision.superset_data or {}
-    if superset.get("rc_bot"):
-        return True
-    groups = superset.get("user_groups") or []
-    for group in groups:
-        if isinstance(group, str) and group.casefold() == "bot":
-            return True
-    return False
+def _casefold_values(values) -> set[str]:
+    if not isinstance(values, list):
+        return set()
+    return {fold_name(str(value)) for value in values if value}
 
 
-def _matched_user_groups(
-    revision: PendingRevision,
-    profile: EditorProfile | None,
-    *,
-    allowed_groups: dict[str, str],
-) -> set[str]:
-    if not allowed_groups:
-        return set()
+def _revision_categories(revision: PendingRevision) -> set[str]:
+    categories = _casefold_values(revision.get_categories())
+    categories |= _casefold_values(revision.page.categories)
+    return categories
 
-    groups: list[str] = []
-    superset = revision.superset_data or {}
-    superset_groups = superset.get("user_groups") or []
-    if isinstance(superset_groups, list):
-        groups.extend(str(group) for group in superset_groups if group)
-    if profile and profile.usergroups:
-        groups.extend(str(group) for group in profile.usergroups if group)
 
-    matched: set[str] = set()
-    for group in groups:
-        normalized = group.casefold()
-        if normalized in allowed_groups:
-            matched.add(allowed_groups[normalized])
-    return matched
+def _matched_user_groups(
+    superset_groups: Iterable[str],
+    profile_groups: frozenset[str] | set[str],
+    *,
+    allowed_groups: NormalizedLookup,
+) -> list[str]:
+    # Probe the precompiled allow-list instead of building a per-revision union.
+    allowed = allowed_groups.keys
+    if allowed.isdisjoint(profile_groups) and allowed.isdisjoint(superset_groups):
+        return []
+    # Distinct lookup keys map to distinct display names, so no dedup is needed.
+    names = allowed_groups.names
+    matched = allowed.intersection(superset_groups)
+    matched |= allowed & profile_groups
+    return sorted(names[group] for group in matched)
 
 
 def _blocking_category_hits(
-    revision: PendingRevision, blocking_lookup: dict[str, str]
-) -> set[str]:
-    if not blocking_lookup:
-        return set()
-
-    categories = list(revision.get_categories())
-    page_categories = revision.page.categories or []
-    if isinstance(page_categories, list):
-        categories.extend(str(category) for category in page_categories if category)
-
-    matched: set[str] = set()
-    for category in categories:
-        normalized = str(category).casefold()
-        if normalized in blocking_lookup:
-            matched.add(blocking_lookup[normalized])
-    return matched
+    revision: PendingRevision, blocking_lookup: NormalizedLookup
+) -> list[str]:
+    if not blocking_lookup.keys:
+        return []
+
+    categories = _revision_categories(revision)
+    names = blocking_lookup.names
+    return sorted(names[category] for category in categories & blocking_lookup.keys)
@@ -0,0 +1,40 @@
+from django.db import migrations, models
+
+
+def populate_superset_fields(apps, schema_editor):
+    PendingRevision = apps.get_model("reviews", "PendingRevision")
+    revisions = []
+    for revision in PendingRevision.objects.only("id", "superset_data").iterator():
+        superset = revision.superset_data or {}
+        groups = superset.get("user_groups")
+        if not isinstance(groups, list):
+            groups = []
+        revision.normalized_user_groups = sorted(
+            {str(group).casefold() for group in groups if group}
+        )
+        revision.rc_bot = bool(superset.get("rc_bot"))
+        revisions.append(revision)
+    PendingRevision.objects.bulk_update(
+        revisions, ["normalized_user_groups", "rc_bot"], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reviews", "0003_pendingpage_categories"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="pendingrevision",
+            name="normalized_user_groups",
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name="pendingrevision",
+            name="rc_bot",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(populate_superset_fields, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations, models
+
+
+def populate_normalized_usergroups(apps, schema_editor):
+    EditorProfile = apps.get_model("reviews", "EditorProfile")
+    profiles = []
+    for profile in EditorProfile.objects.only("id", "usergroups").iterator():
+        groups = profile.usergroups if isinstance(profile.usergroups, list) else []
+        profile.normalized_usergroups = sorted(
+            {str(group).casefold() for group in groups if group}
+        )
+        profiles.append(profile)
+    EditorProfile.objects.bulk_update(profiles, ["normalized_usergroups"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reviews", "0004_pendingrevision_superset_fields"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="editorprofile",
+            name="normalized_usergroups",
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.RunPython(populate_normalized_usergroups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-14 05:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_editorprofile_normalized_usergroups'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pendingpage',
+            index=models.Index(fields=['wiki', 'title'], name='reviews_pen_wiki_id_38c2e8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pendingrevision',
+            index=models.Index(
+                fields=['page', 'timestamp', 'revid'], name='reviews_pen_page_id_19ade0_idx'
+            ),
+        ),
+    ]
@@ -1,14 +1,13 @@
 from __future__ import annotations
 
 from datetime import timedelta
+from functools import cached_property
 import logging
 import os
 
 from django.db import models
 from django.utils import timezone
 
-import pywikibot
-
 logger = logging.getLogger(__name__)
 
 os.environ.setdefault("PYWIKIBOT2_NO_USER_CONFIG", "1")
@@ -48,6 +47,34 @@ class WikiConfiguration(models.Model):
     def __str__(self) -> str:  # pragma: no cover - debug helper
         return f"Configuration for {self.wiki.code}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._clear_lookups()
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._clear_lookups()
+
+    @cached_property
+    def auto_approved_groups_lookup(self):
+        """Casefolded lookup of ``auto_approved_groups`` used by autoreview."""
+
+        from .autoreview import build_configuration_lookup
+
+        return build_configuration_lookup(self.auto_approved_groups)
+
+    @cached_property
+    def blocking_categories_lookup(self):
+        """Casefolded lookup of ``blocking_categories`` used by autoreview."""
+
+        from .autoreview import build_configuration_lookup
+
+        return build_configuration_lookup(self.blocking_categories)
+
+    def _clear_lookups(self) -> None:
+        self.__dict__.pop("auto_approved_groups_lookup", None)
+        self.__dict__.pop("blocking_categories_lookup", None)
+
 
 class PendingPage(models.Model):
     """Represents a page that currently has pending changes."""
@@ -63,11 +90,31 @@ class PendingPage(models.Model):
     class Meta:
         unique_together = ("wiki", "pageid")
         ordering = ["title"]
+        # Pages are listed per wiki in title order.
+        indexes = [models.Index(fields=["wiki", "title"])]
 
     def __str__(self) -> str:  # pragma: no cover - debug helper
         return self.title
 
 
+class PendingRevisionQuerySet(models.QuerySet):
+    def metadata_only(self) -> PendingRevisionQuerySet:
+        """Skip loading the wikitext, which revision listings never read."""
+
+        return self.defer("wikitext")
+
+    def for_autoreview(self, configuration: WikiConfiguration) -> PendingRevisionQuerySet:
+        """Skip the columns the autoreview checks do not read.
+
+        The wikitext is only needed when the wiki has blocking categories.
+        """
+
+        queryset = self.defer("superset_data")
+        if not configuration.blocking_categories_lookup.keys:
+            queryset = queryset.defer("wikitext")
+        return queryset
+
+
 class PendingRevision(models.Model):
     """Revision data cached from the wiki API."""
 
@@ -85,18 +132,50 @@ class PendingRevision(models.Model):
     wikitext = models.TextField()
     categories = models.JSONField(default=list, blank=True)
     superset_data = models.JSONField(default=dict, blank=True)
+    # Derived from ``superset_data`` on save so the autoreview checks can read
+    # them without unpacking the JSON blob for every revision.
+    normalized_user_groups = models.JSONField(default=list, blank=True)
+    rc_bot = models.BooleanField(default=False)
+
+    objects = PendingRevisionQuerySet.as_manager()
+
+    # Set once the wikitext has been loaded from the API, so that an empty
+    # wikitext is not mistaken for a missing one.
+    _wikitext_fetched = False
 
     class Meta:
         unique_together = ("page", "revid")
         ordering = ["timestamp"]
+        # Revisions are read per page oldest first.
+        indexes = [models.Index(fields=["page", "timestamp", "revid"])]
 
     def __str__(self) -> str:  # pragma: no cover - debug helper
         return f"{self.page.title}#{self.revid}"
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        # Partial saves that leave superset_data alone skip the sync, so that a
+        # deferred superset_data is not loaded just to be written back unchanged.
+        if update_fields is None:
+            self.sync_superset_fields()
+        elif "superset_data" in update_fields:
+            self.sync_superset_fields()
+            kwargs["update_fields"] = {*update_fields, "normalized_user_groups", "rc_bot"}
+        super().save(*args, **kwargs)
+
+    def sync_superset_fields(self) -> None:
+        """Refresh the fields derived from ``superset_data``."""
+
+        from .services import normalize_names
+
+        superset = self.superset_data or {}
+        self.normalized_user_groups = normalize_names(superset.get("user_groups"))
+        self.rc_bot = bool(superset.get("rc_bot"))
+
     def get_wikitext(self) -> str:
         """Return the revision wikitext, fetching it via the API when missing."""
 
-        if self.wikitext:
+        if self.wikitext or self._wikitext_fetched:
             return self.wikitext
 
         wikitext = self._fetch_wikitext_from_api()
@@ -124,6 +203,8 @@ class PendingRevision(models.Model):
     def _fetch_wikitext_from_api(self) -> str:
         """Fetch the revision wikitext directly from the wiki API."""
 
+        import pywikibot
+
         site = pywikibot.Site(
             code=self.page.wiki.code,
             fam=self.page.wiki.family,
@@ -159,6 +240,8 @@ class EditorProfile(models.Model):
     wiki = models.ForeignKey(Wiki, on_delete=models.CASCADE, related_name="editor_profiles")
     username = models.CharField(max_length=255)
     usergroups = models.JSONField(default=list, blank=True)
+    # Casefolded copy of ``usergroups`` maintained on save for group matching.
+    normalized_usergroups = models.JSONField(default=list, blank=True)
     is_blocked = models.BooleanField(default=False)
     is_bot = models.BooleanField(default=False)
     is_autopatrolled = models.BooleanField(default=False)
@@ -169,6 +252,16 @@ class EditorProfile(models.Model):
         unique_together = ("wiki", "username")
         ordering = ["username"]
 
+    def save(self, *args, **kwargs):
+        if "usergroups" not in self.get_deferred_fields():
+            from .services import normalize_names
+
+            self.normalized_usergroups = normalize_names(self.usergroups)
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None and "usergroups" in update_fields:
+                kwargs["update_fields"] = {*update_fields, "normalized_usergroups"}
+        super().save(*args, **kwargs)
+
     @property
     def is_expired(self) -> bool:
         return self.fetched_at < timezone.now() - timedelta(minutes=120)
@@ -4,34 +4,156 @@ from __future__ import annotations
 
 import logging
 import os
+import re
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Iterable
 
-import mwparserfromhell
-import pywikibot
-from pywikibot.data.superset import SupersetQuery
-from django.db import transaction
+from django.db import models, transaction
+from django.db.models import Min
 from django.utils import timezone as dj_timezone
 
 from .models import EditorProfile, PendingPage, PendingRevision, Wiki
 
 
-DEFAULT_AUTOREVIEW_GROUPS = {
-    "autoreview",
-    "autoreviewer",
-    "reviewer",
-    "sysop",
-    "editor",
-}
+DEFAULT_AUTOREVIEW_GROUPS = frozenset(
+    {
+        "autoreview",
+        "autoreviewer",
+        "reviewer",
+        "sysop",
+        "editor",
+    }
+)
+
+# Refreshes of the same wiki closer together than this reuse the cached pages.
+REFRESH_MIN_INTERVAL = timedelta(seconds=5)
+
+# Rows per INSERT when caching a refresh; keeps statements bounded for 10k pages.
+BULK_INSERT_BATCH_SIZE = 1000
+
+# Revision ids per API request when prefetching wikitext (the MediaWiki limit).
+WIKITEXT_BATCH_SIZE = 50
+# Concurrent wikitext requests per prefetch, kept low to respect API rate limits.
+WIKITEXT_FETCH_WORKERS = 4
 
 logger = logging.getLogger(__name__)
 
+# ``[[Category:Name]]`` or ``[[Category:Name|sort key]]``; ``[[:Category:Name]]``
+# only links to the category and is deliberately not matched. The name may only
+# hold characters MediaWiki allows in titles (no newline, brackets, braces, pipe
+# or angle brackets); the sort key may contain links of its own.
+_CATEGORY_LINK_RE = re.compile(
+    r"\[\[[ _]*category[ _]*:([^\[\]{}|<>\n]*)(?:\|(?:[^\[\]]|\[\[[^\[\]]*\]\])*)?\]\]",
+    re.IGNORECASE,
+)
+# Comments, nowiki and pre sections, whose links do not categorise the page. An
+# unclosed comment is left alone: MediaWiki would hide the rest of the page, but
+# for the blocking check it is safer to still see those categories.
+_UNPARSED_WIKITEXT_RE = re.compile(
+    r"<!--.*?-->|<nowiki\s*>.*?</nowiki\s*>|<pre(?:\s[^>]*)?>.*?</pre\s*>",
+    re.DOTALL | re.IGNORECASE,
+)
+# MediaWiki's compact "YYYYMMDDHHMMSS" timestamp layout, always in UTC.
+_MEDIAWIKI_TIMESTAMP_FORMAT = "%Y%m%d%H%M%S"
+
+# Superset query for the pending pages and their unreviewed revisions. Each list
+# column is aggregated in its own subquery, so tags, groups and categories never
+# multiply into one another. It is built once; only the validated integer limit
+# is substituted per call, since SupersetQuery takes a plain SQL string without
+# bind parameters.
+_PENDING_PAGES_SQL = """
+select
+   page_title,
+   page_namespace,
+   page_is_redirect,
+   fp_page_id,
+   fp_pending_since,
+   fp_stable,
+   rev_id,
+   rev_timestamp,
+   rev_len,
+   rev_parent_id,
+   rev_deleted,
+   rev_sha1,
+   comment_text,
+   a.actor_name,
+   a.actor_user,
+   (SELECT group_concat(DISTINCT ctd_name) FROM change_tag
+       JOIN change_tag_def ON ct_tag_id = ctd_id
+    WHERE ct_rev_id = r.rev_id) as change_tags,
+   (SELECT group_concat(DISTINCT ug_group) FROM user_groups
+    WHERE ug_user = a.actor_user) as user_groups,
+   (SELECT group_concat(DISTINCT ufg_group) FROM user_former_groups
+    WHERE ufg_user = a.actor_user) as user_former_groups,
+   (SELECT group_concat(DISTINCT cl_to) FROM categorylinks
+    WHERE cl_from = page_id) as page_categories,
+   rc_bot,
+   rc_patrolled
+from
+   (SELECT fp_page_id, fp_pending_since, fp_stable FROM flaggedpages
+    ORDER BY fp_pending_since DESC LIMIT {limit}) as fp,
+   revision as r
+       LEFT JOIN recentchanges ON rc_this_oldid = r.rev_id AND rc_source="mw.edit",
+   page as p,
+   comment_revision,
+   actor_revision as a
+where
+   fp_pending_since IS NOT NULL
+   AND r.rev_page=fp_page_id
+   AND page_id=fp_page_id
+   and page_namespace=0
+   AND r.rev_id>=fp_stable
+   AND r.rev_actor=a.actor_id
+   AND r.rev_comment_id=comment_id
+ORDER BY fp_pending_since, rev_id DESC
+"""
+
+# Superset columns kept in PendingRevision.superset_data, by how they are parsed.
+_SUPERSET_LIST_COLUMNS = ("change_tags", "user_groups", "user_former_groups", "page_categories")
+_SUPERSET_FLAG_COLUMNS = ("rc_bot", "rc_patrolled", "user_blocked")
+
+# Columns refreshed from Superset on pages and revisions that are already cached.
+_PAGE_SYNC_FIELDS = ("title", "stable_revid", "pending_since", "categories")
+_REVISION_SYNC_FIELDS = (
+    "parentid",
+    "user_name",
+    "user_id",
+    "timestamp",
+    "comment",
+    "change_tags",
+    "superset_data",
+    "normalized_user_groups",
+    "rc_bot",
+)
+
+_refresh_locks: dict[int, threading.Lock] = {}
+_refresh_locks_guard = threading.Lock()
+
 os.environ.setdefault("PYWIKIBOT2_NO_USER_CONFIG", "1")
 os.environ.setdefault("PYWIKIBOT_NO_USER_CONFIG", "2")
 
 
+# One instance is built per ingested revision, so skip the per-instance dict.
+# __slots__ is spelled out instead of ``slots=True``, which needs Python 3.10.
 @dataclass
 class RevisionPayload:
+    __slots__ = (
+        "revid",
+        "parentid",
+        "user",
+        "userid",
+        "timestamp",
+        "comment",
+        "sha1",
+        "tags",
+        "superset_data",
+    )
+
     revid: int
     parentid: int | None
     user: str | None
@@ -40,13 +162,17 @@ class RevisionPayload:
     comment: str
     sha1: str
     tags: list[str]
-    superset_data: dict | None = None
+    superset_data: dict | None
 
 
 class WikiClient:
     """Client responsible for synchronising data for a wiki."""
 
     def __init__(self, wiki: Wiki):
+        # Pywikibot takes a noticeable time to import, so only pay for it when a
+        # client is actually built rather than in every management command.
+        import pywikibot
+
         self.wiki = wiki
         self.site = pywikibot.Site(code=wiki.code, fam=wiki.family)
 
@@ -57,152 +183,185 @@ class WikiClient:
         if limit <= 0:
             return []
 
-        sql_query = f"""
-select
-   page_title,
-   page_namespace,
-   page_is_redirect,
-   fp_page_id,
-   fp_pending_since,
-   fp_stable, 
-   rev_id,
-   rev_timestamp,
-   rev_len,
-   rev_parent_id,
-   rev_deleted,
-   rev_sha1,
-   comment_text,
-   a.actor_name,
-   a.actor_user,
-   group_concat(DISTINCT(ctd_name)) as change_tags,
-   group_concat(DISTINCT(ug_group)) as user_groups,
-   group_concat(DISTINCT(ufg_group)) as user_former_groups,
-   group_concat(DISTINCT(cl_to)) as page_categories,
-   rc_bot,
-   rc_patrolled
-from
-   (SELECT * FROM flaggedpages ORDER BY fp_pending_since DESC LIMIT {limit}) as fp,
-   revision as r
-       LEFT JOIN change_tag ON r.rev_id=ct_rev_id 
-       LEFT JOIN change_tag_def ON ct_tag_id = ctd_id
-       LEFT JOIN recentchanges ON rc_this_oldid = r.rev_id AND rc_source="mw.edit"
-   , 
-   page as p
-       LEFT JOIN categorylinks ON cl_from = page_id,
-   comment_revision,
-   actor_revision as a
-   LEFT JOIN user_groups ON a.actor_user=ug_user
-   LEFT JOIN user_former_groups ON a.actor_user=ufg_user
-where
-   fp_pending_since IS NOT NULL 
-   AND r.rev_page=fp_page_id 
-   AND page_id=fp_page_id 
-   and page_namespace=0 
-   AND r.rev_id>=fp_stable
-   AND r.rev_actor=a.actor_id
-   AND r.rev_comment_id=comment_id
-GROUP BY r.rev_id
-ORDER BY fp_pending_since, rev_id DESC
-"""
+        sql_query = _PENDING_PAGES_SQL.format(limit=limit)
+
+        from pywikibot.data.superset import SupersetQuery
 
         superset = SupersetQuery(site=self.site)
         payload = superset.query(sql_query)
         pages: list[PendingPage] = []
         pages_by_id: dict[int, PendingPage] = {}
+        # Latest Superset metadata per editor; profiles are updated once each.
+        editor_metadata: dict[str, dict | None] = {}
+        # Later rows for the same revision replace earlier ones, as an upsert would.
+        revisions_by_key: dict[tuple[int, int], PendingRevision] = {}
+        # One reference time for the whole batch, for ages and missing timestamps.
+        now = dj_timezone.now()
+
+        # Build the pages and revisions in one pass so that each raw row can be
+        # released once read; both are then stored in bulk.
+        for entry in payload:
+            # Rows may lack columns, so itemgetter is not an option; binding the
+            # lookup once still saves an attribute access per column.
+            get = entry.get
+            pageid = get("fp_page_id")
+            try:
+                pageid_int = int(pageid)
+            except (TypeError, ValueError):
+                continue
+            # Parse the list columns once and reuse them for the page and revision.
+            superset_data = _prepare_superset_metadata(entry)
+            page_categories = superset_data.get("page_categories") or []
+
+            page = pages_by_id.get(pageid_int)
+            if page is None:
+                page = PendingPage(
+                    wiki=self.wiki,
+                    pageid=pageid_int,
+                    title=get("page_title", ""),
+                    stable_revid=int(get("fp_stable") or 0),
+                    pending_since=parse_superset_timestamp(get("fp_pending_since")),
+                    categories=page_categories,
+                )
+                pages_by_id[pageid_int] = page
+                pages.append(page)
+            elif page_categories != (page.categories or []):
+                page.categories = page_categories
+
+            revid = get("rev_id")
+            try:
+                revid_int = int(revid)
+            except (TypeError, ValueError):
+                continue
+
+            superset_revision_timestamp = parse_superset_timestamp(get("rev_timestamp"))
+            if superset_revision_timestamp is None:
+                superset_revision_timestamp = now
+
+            payload_entry = RevisionPayload(
+                revid=revid_int,
+                parentid=_parse_optional_int(get("rev_parent_id")),
+                user=get("actor_name"),
+                userid=_parse_optional_int(get("actor_user")),
+                timestamp=superset_revision_timestamp,
+                comment=get("comment_text", "") or "",
+                sha1=get("rev_sha1", "") or "",
+                tags=superset_data.get("change_tags") or [],
+                superset_data=superset_data,
+            )
+            revision = self._build_revision(page, payload_entry, now)
+            revisions_by_key[page.pageid, revid_int] = revision
+            if payload_entry.user:
+                editor_metadata[payload_entry.user] = payload_entry.superset_data
+        # The revisions keep their own metadata copies; drop the raw rows now.
+        del payload
 
         with transaction.atomic():
-            PendingRevision.objects.filter(page__wiki=self.wiki).delete()
-            PendingPage.objects.filter(wiki=self.wiki).delete()
-            for entry in payload:
-                pageid = entry.get("fp_page_id")
-                try:
-                    pageid_int = int(pageid)
-                except (TypeError, ValueError):
-                    continue
-                page_categories = parse_superset_list(entry.get("page_categories"))
-
-                page = pages_by_id.get(pageid_int)
-                if page is None:
-                    pending_since = parse_superset_timestamp(
-                        entry.get("fp_pending_since")
-                    )
-                    page = PendingPage.objects.create(
-                        wiki=self.wiki,
-                        pageid=pageid_int,
-                        title=entry.get("page_title", ""),
-                        stable_revid=int(entry.get("fp_stable") or 0),
-                        pending_since=pending_since,
-                        categories=page_categories,
-                    )
-                    pages_by_id[pageid_int] = page
-                    pages.append(page)
-                elif page_categories != (page.categories or []):
-                    page.categories = page_categories
-                    page.save(update_fields=["categories"])
-
-                revid = entry.get("rev_id")
-                try:
-                    revid_int = int(revid)
-                except (TypeError, ValueError):
-                    continue
-
-                superset_revision_timestamp = parse_superset_timestamp(
-                    entry.get("rev_timestamp")
-                )
-                if superset_revision_timestamp is None:
-                    superset_revision_timestamp = dj_timezone.now()
-
-                payload_entry = RevisionPayload(
-                    revid=revid_int,
-                    parentid=_parse_optional_int(entry.get("rev_parent_id")),
-                    user=entry.get("actor_name"),
-                    userid=_parse_optional_int(entry.get("actor_user")),
-                    timestamp=superset_revision_timestamp,
-                    comment=entry.get("comment_text", "") or "",
-                    sha1=entry.get("rev_sha1", "") or "",
-                    tags=parse_superset_list(entry.get("change_tags")),
-                    superset_data=_prepare_superset_metadata(entry),
-                )
-                self._save_revision(page, payload_entry)
+            self._store_pending_rows(pages, revisions_by_key, now)
+            self.ensure_editor_profiles(editor_metadata)
 
         return pages
 
-    def _save_revision(
-        self, page: PendingPage, payload: RevisionPayload
-    ) -> PendingRevision | None:
-        existing_page = (
-            PendingPage.objects.filter(pk=page.pk).only("id").first()
-            if page.pk
-            else None
+    def _store_pending_rows(
+        self,
+        pages: list[PendingPage],
+        revisions_by_key: dict[tuple[int, int], PendingRevision],
+        now: datetime,
+    ) -> None:
+        """Bring the cached rows in line with a new Superset result.
+
+        Most pages and revisions are unchanged between polls, so only rows that
+        disappeared are deleted, only changed ones are updated and only new ones
+        are inserted. Revisions that are kept also keep their wikitext and parsed
+        categories, unless their content (sha1) changed.
+        """
+
+        existing_pages = {
+            page.pageid: page for page in PendingPage.objects.filter(wiki=self.wiki)
+        }
+        pageid_by_pk = {page.pk: pageid for pageid, page in existing_pages.items()}
+        existing_revisions = {
+            (pageid_by_pk[revision.page_id], revision.revid): revision
+            for revision in PendingRevision.objects.filter(page__wiki=self.wiki).metadata_only()
+        }
+
+        new_pages: list[PendingPage] = []
+        changed_pages: list[PendingPage] = []
+        for page in pages:
+            current = existing_pages.pop(page.pageid, None)
+            if current is None:
+                new_pages.append(page)
+                continue
+            page.pk = current.pk
+            page.fetched_at = now
+            if any(
+                getattr(page, field) != getattr(current, field) for field in _PAGE_SYNC_FIELDS
+            ):
+                changed_pages.append(page)
+        # Whatever is left is no longer pending; deleting a page cascades to
+        # its revisions.
+        stale_page_pks = {page.pk for page in existing_pages.values()}
+
+        # New and changed revisions are written together as one upsert.
+        upserted_revisions: list[PendingRevision] = []
+        stale_revision_pks: list[int] = []
+        for key, revision in revisions_by_key.items():
+            current = existing_revisions.pop(key, None)
+            if current is None:
+                upserted_revisions.append(revision)
+            elif current.sha1 != revision.sha1:
+                # New content, so the cached wikitext and categories are stale.
+                stale_revision_pks.append(current.pk)
+                upserted_revisions.append(revision)
+            elif any(
+                getattr(revision, field) != getattr(current, field)
+                for field in _REVISION_SYNC_FIELDS
+            ):
+                upserted_revisions.append(revision)
+        stale_revision_pks.extend(
+            revision.pk
+            for revision in existing_revisions.values()
+            if revision.page_id not in stale_page_pks
         )
-        if existing_page is None:
-            logger.warning(
-                "Pending page %s was deleted before saving revision %s", page.pk, payload.revid
-            )
-            return None
 
-        age = dj_timezone.now() - payload.timestamp
-        defaults = {
-            "parentid": payload.parentid,
-            "user_name": payload.user or "",
-            "user_id": payload.userid,
-            "timestamp": payload.timestamp,
-            "age_at_fetch": age,
-            "sha1": payload.sha1,
-            "comment": payload.comment,
-            "change_tags": payload.tags,
-            "wikitext": "",
-        }
-        if payload.superset_data is not None:
-            defaults["superset_data"] = payload.superset_data
+        _delete_by_pk(PendingRevision, stale_revision_pks)
+        _delete_by_pk(PendingPage, list(stale_page_pks))
+        # bulk_update skips auto_now, so mark the kept pages as fetched here.
+        PendingPage.objects.filter(wiki=self.wiki).update(fetched_at=now)
+        if changed_pages:
+            PendingPage.objects.bulk_update(
+                changed_pages, _PAGE_SYNC_FIELDS, batch_size=BULK_INSERT_BATCH_SIZE
+            )
+        PendingPage.objects.bulk_create(new_pages, batch_size=BULK_INSERT_BATCH_SIZE)
+        # Changed revisions conflict on (page, revid) and only get their
+        # Superset columns updated, keeping the cached wikitext and categories.
+        PendingRevision.objects.bulk_create(
+            upserted_revisions,
+            batch_size=BULK_INSERT_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=["page", "revid"],
+            update_fields=_REVISION_SYNC_FIELDS,
+        )
 
-        revision, _ = PendingRevision.objects.update_or_create(
-            page=existing_page,
+    def _build_revision(
+        self, page: PendingPage, payload: RevisionPayload, now: datetime
+    ) -> PendingRevision:
+        revision = PendingRevision(
+            page=page,
             revid=payload.revid,
-            defaults=defaults,
+            parentid=payload.parentid,
+            user_name=payload.user or "",
+            user_id=payload.userid,
+            timestamp=payload.timestamp,
+            age_at_fetch=now - payload.timestamp,
+            sha1=payload.sha1,
+            comment=payload.comment,
+            change_tags=payload.tags,
+            wikitext="",
+            superset_data=payload.superset_data if payload.superset_data is not None else {},
         )
-        if payload.user:
-            self.ensure_editor_profile(payload.user, payload.superset_data)
+        # bulk_create bypasses PendingRevision.save, which keeps these in sync.
+        revision.sync_superset_fields()
         return revision
 
     def ensure_editor_profile(
@@ -222,17 +381,7 @@ ORDER BY fp_pending_since, rev_id DESC
         if not superset_data:
             return profile
 
-        groups = sorted(superset_data.get("user_groups") or [])
-        normalized_groups = {
-            str(group).casefold() for group in groups if isinstance(group, str)
-        }
-        profile.usergroups = groups
-        profile.is_bot = "bot" in normalized_groups or bool(superset_data.get("rc_bot"))
-        profile.is_autopatrolled = "autopatrolled" in normalized_groups
-        profile.is_autoreviewed = bool(
-            DEFAULT_AUTOREVIEW_GROUPS & normalized_groups
-        )
-        profile.is_blocked = bool(superset_data.get("user_blocked", False))
+        _apply_editor_superset_data(profile, superset_data)
         profile.save(
             update_fields=[
                 "usergroups",
@@ -245,41 +394,252 @@ ORDER BY fp_pending_since, rev_id DESC
         )
         return profile
 
-    def refresh(self) -> list[PendingPage]:
-        return self.fetch_pending_pages()
+    def ensure_editor_profiles(self, superset_data_by_username: dict[str, dict | None]) -> None:
+        """Create or update the profiles of several editors with a few bulk queries.
+
+        Editors with Superset metadata get their groups and flags refreshed;
+        the others only get an empty profile when they do not have one yet.
+        """
+
+        if not superset_data_by_username:
+            return
+
+        # Every column written below is recomputed, so only the keys are loaded.
+        existing = {
+            profile.username: profile
+            for profile in EditorProfile.objects.filter(
+                wiki=self.wiki, username__in=superset_data_by_username
+            ).only("id", "username")
+        }
+        now = dj_timezone.now()
+        created: list[EditorProfile] = []
+        updated: list[EditorProfile] = []
+        for username, superset_data in superset_data_by_username.items():
+            profile = existing.get(username)
+            if profile is None:
+                profile = EditorProfile(wiki=self.wiki, username=username, usergroups=[])
+                created.append(profile)
+            elif superset_data:
+                updated.append(profile)
+            else:
+                continue
+            if superset_data:
+                _apply_editor_superset_data(profile, superset_data)
+            # Bulk writes bypass EditorProfile.save, which normally keeps these current.
+            profile.normalized_usergroups = normalize_names(profile.usergroups)
+            profile.fetched_at = now
+
+        EditorProfile.objects.bulk_create(created)
+        EditorProfile.objects.bulk_update(
+            updated,
+            [
+                "usergroups",
+                "normalized_usergroups",
+                "is_blocked",
+                "is_bot",
+                "is_autopatrolled",
+                "is_autoreviewed",
+                "fetched_at",
+            ],
+        )
+
+    def refresh(self, *, force: bool = False) -> list[PendingPage]:
+        """Refresh the cached pending pages of the wiki from Superset.
+
+        Concurrent refreshes of one wiki are serialised, and a refresh that
+        arrives within ``REFRESH_MIN_INTERVAL`` of the previous one returns its
+        pages instead of querying Superset again unless ``force`` is set.
+        """
+
+        with _refresh_lock(self.wiki.pk):
+            if not force:
+                pages = self._recently_fetched_pages()
+                if pages:
+                    return pages
+            return self.fetch_pending_pages()
+
+    def _recently_fetched_pages(self) -> list[PendingPage]:
+        queryset = PendingPage.objects.filter(wiki=self.wiki)
+        oldest_fetch = queryset.aggregate(oldest=Min("fetched_at"))["oldest"]
+        if oldest_fetch is None or oldest_fetch < dj_timezone.now() - REFRESH_MIN_INTERVAL:
+            return []
+        return list(queryset)
+
+
+def _delete_by_pk(model: type[models.Model], pks: list[int]) -> None:
+    # Batched so that large refreshes stay under the database's parameter limit.
+    for start in range(0, len(pks), BULK_INSERT_BATCH_SIZE):
+        batch = pks[start:start + BULK_INSERT_BATCH_SIZE]
+        model.objects.filter(pk__in=batch).delete()
+
+
+def _refresh_lock(wiki_id: int) -> threading.Lock:
+    with _refresh_locks_guard:
+        return _refresh_locks.setdefault(wiki_id, threading.Lock())
+
+
+def _apply_editor_superset_data(profile: EditorProfile, superset_data: dict) -> None:
+    groups = sorted(superset_data.get("user_groups") or [])
+    normalized_groups = {fold_name(group) for group in groups if isinstance(group, str)}
+    profile.usergroups = groups
+    profile.is_bot = "bot" in normalized_groups or bool(superset_data.get("rc_bot"))
+    profile.is_autopatrolled = "autopatrolled" in normalized_groups
+    profile.is_autoreviewed = not DEFAULT_AUTOREVIEW_GROUPS.isdisjoint(normalized_groups)
+    profile.is_blocked = bool(superset_data.get("user_blocked", False))
+
+
+def prefetch_revision_wikitext(revisions: Iterable[PendingRevision]) -> None:
+    """Fetch the missing wikitext of revisions with batched API requests.
+
+    The revisions must belong to the same wiki. Revisions whose categories or
+    wikitext are already cached are skipped, and those the API does not return
+    are left for ``PendingRevision.get_wikitext`` to retry on its own.
+    """
+
+    missing = [
+        revision for revision in revisions if not revision.categories and not revision.wikitext
+    ]
+    if not missing:
+        return
+
+    import pywikibot
+
+    wiki = missing[0].page.wiki
+    site = pywikibot.Site(code=wiki.code, fam=wiki.family)
+    batches = [
+        missing[start:start + WIKITEXT_BATCH_SIZE]
+        for start in range(0, len(missing), WIKITEXT_BATCH_SIZE)
+    ]
+    # Only the API requests run in worker threads; the database writes stay on
+    # the calling thread and its connection.
+    if len(batches) == 1:
+        batch_contents = [_fetch_wikitext_batch(site, batches[0])]
+    else:
+        with ThreadPoolExecutor(
+            max_workers=min(WIKITEXT_FETCH_WORKERS, len(batches))
+        ) as executor:
+            batch_contents = list(
+                executor.map(lambda batch: _fetch_wikitext_batch(site, batch), batches)
+            )
+
+    # Parse the categories here too, so get_categories does not save each
+    # revision again with its own UPDATE.
+    fetched = []
+    for batch, contents in zip(batches, batch_contents):
+        for revision in batch:
+            content = contents.get(revision.revid)
+            # Blank pages come back as an empty string; keep those too, or
+            # get_wikitext would request each of them again on its own.
+            if content is not None:
+                revision.wikitext = content
+                revision.categories = parse_categories(content)
+                revision._wikitext_fetched = True
+                fetched.append(revision)
+    PendingRevision.objects.bulk_update(
+        fetched, ["wikitext", "categories"], batch_size=WIKITEXT_BATCH_SIZE
+    )
+
+
+def _fetch_wikitext_batch(site, revisions: list[PendingRevision]) -> dict[int, str]:
+    request = site.simple_request(
+        action="query",
+        prop="revisions",
+        revids="|".join(str(revision.revid) for revision in revisions),
+        rvprop="ids|content",
+        rvslots="main",
+        formatversion=2,
+    )
+    try:
+        response = request.submit()
+    except Exception:  # pragma: no cover - network failure fallback
+        logger.exception("Failed to prefetch wikitext for %d revisions", len(revisions))
+        return {}
+
+    contents: dict[int, str] = {}
+    for page in response.get("query", {}).get("pages", []):
+        for revision in page.get("revisions", []) or []:
+            slots = revision.get("slots", {}) or {}
+            content = (slots.get("main", {}) or {}).get("content")
+            if content is not None and revision.get("revid") is not None:
+                contents[int(revision["revid"])] = str(content)
+    return contents
 
 
 def parse_categories(wikitext: str) -> list[str]:
-    code = mwparserfromhell.parse(wikitext or "")
-    categories: list[str] = []
-    for link in code.filter_wikilinks():
-        target = str(link.title).strip()
-        if target.lower().startswith("category:"):
-            categories.append(target.split(":", 1)[-1])
-    return sorted(set(categories))
+    # Only category links are needed, so scan for them directly rather than
+    # building a full wikitext parse tree for every revision.
+    if not wikitext:
+        return []
+    if "<" in wikitext:
+        wikitext = _UNPARSED_WIKITEXT_RE.sub("", wikitext)
+    categories = set()
+    for match in _CATEGORY_LINK_RE.finditer(wikitext):
+        # Normalise the title like MediaWiki: drop any fragment, treat
+        # underscores as spaces and collapse runs of them.
+        name = " ".join(match.group(1).split("#", 1)[0].replace("_", " ").split())
+        if name:
+            categories.add(name)
+    return sorted(categories)
+
+
+def fold_name(value: str) -> str:
+    """Casefold a group or category name for case-insensitive comparison."""
+
+    # ``str.lower`` matches ``casefold`` for ASCII and skips the Unicode tables.
+    return value.lower() if value.isascii() else value.casefold()
+
+
+def normalize_names(values) -> list[str]:
+    """Return the sorted, casefolded, de-duplicated names from a JSON list."""
+
+    if not isinstance(values, list):
+        return []
+    # Editors share a handful of group combinations, so cache them by value.
+    return list(_normalized_name_tuple(tuple(str(value) for value in values if value)))
+
+
+@lru_cache(maxsize=512)
+def _normalized_name_tuple(values: tuple[str, ...]) -> tuple[str, ...]:
+    # A wiki has only a few dozen group names; intern them so every cached tuple
+    # and configuration lookup shares one string object per name.
+    return tuple(sorted({sys.intern(fold_name(value)) for value in values}))
 
 
 def parse_superset_timestamp(value: str | None) -> datetime | None:
     if not value:
         return None
-    normalized = value.replace("Z", "+00:00")
-    try:
-        timestamp = datetime.fromisoformat(normalized)
-    except ValueError:
+    # Superset sends "YYYY-MM-DD HH:MM:SS" or "YYYY-MM-DDTHH:MM:SSZ"; read those
+    # fields by position instead of rewriting the string for the generic parser.
+    if (
+        (len(value) == 19 or (len(value) == 20 and value[19] == "Z"))
+        and value[4] == "-"
+        and value[7] == "-"
+        and value[10] in " T"
+        and value[13] == ":"
+        and value[16] == ":"
+    ):
         try:
-            timestamp = datetime.fromisoformat(normalized.replace(" ", "T"))
+            return datetime(
+                int(value[0:4]),
+                int(value[5:7]),
+                int(value[8:10]),
+                int(value[11:13]),
+                int(value[14:16]),
+                int(value[17:19]),
+                tzinfo=timezone.utc,
+            )
         except ValueError:
-            if normalized.isdigit() and len(normalized) == 14:
-                try:
-                    timestamp = datetime.strptime(normalized, "%Y%m%d%H%M%S")
-                except ValueError:
-                    logger.warning("Unable to parse Superset timestamp: %s", value)
-                    return None
-                else:
-                    timestamp = timestamp.replace(tzinfo=timezone.utc)
-            else:
-                logger.warning("Unable to parse Superset timestamp: %s", value)
-                return None
+            pass
+    # Pick the parser from the shape of the value rather than by trial and error.
+    try:
+        if len(value) == 14 and value.isdigit():
+            timestamp = datetime.strptime(value, _MEDIAWIKI_TIMESTAMP_FORMAT)
+        else:
+            # fromisoformat accepts either a "T" or a space between date and time.
+            timestamp = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        logger.warning("Unable to parse Superset timestamp: %s", value)
+        return None
     if timestamp.tzinfo is None:
         timestamp = timestamp.replace(tzinfo=timezone.utc)
     return timestamp
@@ -288,34 +648,38 @@ def parse_superset_timestamp(value: str | None) -> datetime | None:
 def parse_superset_list(value: str | None) -> list[str]:
     if not value:
         return []
-    return [item.strip() for item in value.split(",") if item and item.strip()]
+    return [stripped for item in value.split(",") if (stripped := item.strip())]
 
 
 def _parse_optional_int(value) -> int | None:
+    if value is None:
+        return None
+    # Superset returns ints or digit strings; skip the exception setup for both.
+    # isdecimal, unlike isdigit, only passes strings that int() accepts ("²" is a
+    # digit but not decimal).
+    if type(value) is int:
+        return value
+    if isinstance(value, str) and value.isdecimal():
+        return int(value)
     try:
-        if value is None:
-            return None
         return int(value)
     except (TypeError, ValueError):
         return None
 
 
 def _prepare_superset_metadata(entry: dict) -> dict:
-    metadata = dict(entry)
-    for key in (
-        "change_tags",
-        "user_groups",
-        "user_former_groups",
-        "page_categories",
-    ):
-        if key in metadata and isinstance(metadata[key], str):
-            metadata[key] = parse_superset_list(metadata[key])
-    if "actor_user" in metadata:
-        metadata["actor_user"] = _parse_optional_int(metadata.get("actor_user"))
-    if "rc_bot" in metadata:
-        metadata["rc_bot"] = _parse_superset_bool(metadata.get("rc_bot"))
-    if "rc_patrolled" in metadata:
-        metadata["rc_patrolled"] = _parse_superset_bool(metadata.get("rc_patrolled"))
+    # Only keep the columns read back from superset_data; the rest of the row
+    # is stored in the model's own fields already.
+    metadata = {}
+    for key in _SUPERSET_LIST_COLUMNS:
+        if key in entry:
+            value = entry[key]
+            metadata[key] = parse_superset_list(value) if isinstance(value, str) else value
+    if "actor_user" in entry:
+        metadata["actor_user"] = _parse_optional_int(entry["actor_user"])
+    for key in _SUPERSET_FLAG_COLUMNS:
+        if key in entry:
+            metadata[key] = _parse_superset_bool(entry[key])
     return metadata
 
 
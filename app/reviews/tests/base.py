@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+from django.test import TestCase
+
+from reviews.models import Wiki, WikiConfiguration
+
+
+class BaseReviewsTestCase(TestCase):
+    """Test case with a configured wiki created once per class."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.wiki = Wiki.objects.create(
+            name="Example Wiki",
+            code="ex",
+            api_endpoint="https://example.org/api.php",
+        )
+        WikiConfiguration.objects.create(wiki=cls.wiki)
+        # One reference time for the fixture timestamps of every test.
+        cls.now = datetime.now(timezone.utc)
@@ -1,11 +1,39 @@
 from __future__ import annotations
 
+from datetime import datetime, timedelta, timezone
+from types import MappingProxyType
 from unittest import mock
 
-from django.test import TestCase
+from django.test import SimpleTestCase
 
-from reviews.models import EditorProfile, PendingPage, PendingRevision, Wiki
-from reviews.services import WikiClient, parse_categories
+from reviews.models import EditorProfile, PendingPage, PendingRevision
+from reviews.services import (
+    WikiClient,
+    _parse_optional_int,
+    parse_categories,
+    parse_superset_timestamp,
+    prefetch_revision_wikitext,
+)
+from reviews.tests.base import BaseReviewsTestCase
+
+# Shared read-only Superset row for tests that only need one pending edit.
+_PENDING_ROW = MappingProxyType(
+    {
+        "fp_page_id": 1,
+        "page_title": "Page",
+        "fp_stable": 1,
+        "fp_pending_since": "2024-01-01T00:00:00Z",
+        "rev_id": 2,
+        "rev_timestamp": "2024-01-01 01:00:00",
+        "rev_parent_id": 1,
+        "comment_text": "Edit",
+        "rev_sha1": "hash",
+        "change_tags": "tag",
+        "user_groups": "user",
+        "actor_name": "User",
+        "actor_user": 5,
+    }
+)
 
 
 class FakeRequest:
@@ -19,53 +47,79 @@ class FakeRequest:
 class FakeSite:
     def __init__(self):
         self.response = {"query": {"pages": []}}
-        self.users_data: dict[str, dict] = {}
         self.requests: list[dict] = []
 
     def simple_request(self, **kwargs):
         self.requests.append(kwargs)
         return FakeRequest(self.response)
 
-    def users(self, users):
-        for username in users:
-            data = self.users_data.get(username)
-            if data is not None:
-                yield data
-            else:
-                yield {
-                    "name": username,
-                    "groups": [],
-                }
 
+class ParsingTests(SimpleTestCase):
+    def test_parse_categories_extracts_unique_names(self):
+        wikitext = (
+            "Some text [[Category:Example]] and [[category:Second|label]] "
+            "and [[Category:Example]]"
+        )
+        categories = parse_categories(wikitext)
+        self.assertEqual(categories, ["Example", "Second"])
 
-class WikiClientTests(TestCase):
-    def setUp(self):
-        self.wiki = Wiki.objects.create(
-            name="Test Wiki",
-            code="test",
-            api_endpoint="https://test.example/api.php",
+    def test_parse_categories_ignores_links_that_do_not_categorise(self):
+        wikitext = (
+            "See [[:Category:Linked]] and [[Main Page]]. "
+            "<!-- [[Category:Commented]] --> <nowiki>[[Category:Escaped]]</nowiki> "
+            "[[ Category: Spaced name |key]]"
         )
+        self.assertEqual(parse_categories(wikitext), ["Spaced name"])
+
+    def test_parse_categories_follows_mediawiki_link_rules(self):
+        cases = {
+            "<pre>[[Category:Pre]]</pre> <PRE class='x'>[[Category:Upper]]</PRE>": [],
+            "[[Category:Foo|sort [[x]]]]": ["Foo"],
+            "[[Category:Foo\n|key]] [[Category:Bar\n]]": [],
+            "[[Category:{{Template}}]] [[Category:<b>]]": [],
+            "[[Category:Foo_bar#Section]] [[category : Foo  bar ]]": ["Foo bar"],
+            # Unlike MediaWiki, an unclosed comment does not hide what follows.
+            "<!-- [[Category:Commented]] --> <!-- [[Category:Unclosed]]": ["Unclosed"],
+        }
+        for wikitext, expected in cases.items():
+            with self.subTest(wikitext=wikitext):
+                self.assertEqual(parse_categories(wikitext), expected)
+
+    def test_parse_superset_timestamp_accepts_superset_formats(self):
+        expected = datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+        for value in (
+            "2024-01-02 03:04:05",
+            "2024-01-02T03:04:05Z",
+            "2024-01-02T03:04:05+00:00",
+            "20240102030405",
+        ):
+            with self.subTest(value=value):
+                self.assertEqual(parse_superset_timestamp(value), expected)
+        self.assertIsNone(parse_superset_timestamp("2024-13-02 03:04:05"))
+
+    def test_parse_optional_int_rejects_non_decimal_values(self):
+        self.assertEqual(_parse_optional_int(5), 5)
+        self.assertEqual(_parse_optional_int("42"), 42)
+        for value in ("²", "", "abc", None, [1]):
+            with self.subTest(value=value):
+                self.assertIsNone(_parse_optional_int(value))
+
+
+class WikiClientTests(BaseReviewsTestCase):
+    def setUp(self):
         self.fake_site = FakeSite()
         self.site_patcher = mock.patch(
-            "reviews.services.pywikibot.Site",
+            "pywikibot.Site",
             return_value=self.fake_site,
         )
         self.site_patcher.start()
         self.addCleanup(self.site_patcher.stop)
-        self.superset_patcher = mock.patch("reviews.services.SupersetQuery")
+        self.superset_patcher = mock.patch("pywikibot.data.superset.SupersetQuery")
         self.mock_superset_cls = self.superset_patcher.start()
         self.addCleanup(self.superset_patcher.stop)
         self.mock_superset = self.mock_superset_cls.return_value
         self.mock_superset.query.return_value = []
 
-    def test_parse_categories_extracts_unique_names(self):
-        wikitext = (
-            "Some text [[Category:Example]] and [[category:Second|label]] "
-            "and [[Category:Example]]"
-        )
-        categories = parse_categories(wikitext)
-        self.assertEqual(categories, ["Example", "Second"])
-
     def test_fetch_pending_pages_caches_pages(self):
         self.mock_superset.query.return_value = [
             {
@@ -106,7 +160,12 @@ class WikiClientTests(TestCase):
         self.assertEqual(revision.categories, [])
         self.assertEqual(revision.user_id, 321)
         self.assertTrue(revision.superset_data["rc_bot"])
+        self.assertTrue(revision.rc_bot)
+        self.assertEqual(revision.normalized_user_groups, ["autopatrolled", "bot"])
         self.assertEqual(revision.superset_data["page_categories"], ["Foo", "Bar"])
+        # Columns with their own model fields are not duplicated in the JSON.
+        self.assertNotIn("comment_text", revision.superset_data)
+        self.assertNotIn("page_title", revision.superset_data)
 
     def test_fetch_pending_pages_includes_stable_revision_record(self):
         self.mock_superset.query.return_value = [
@@ -177,6 +236,120 @@ class WikiClientTests(TestCase):
         self.assertTrue(profile.is_autoreviewed)
         self.assertFalse(profile.is_autopatrolled)
 
+    def test_fetch_pending_pages_updates_each_editor_profile_once(self):
+        self.mock_superset.query.return_value = [
+            {
+                "fp_page_id": 333,
+                "page_title": "Repeat",
+                "fp_stable": 40,
+                "fp_pending_since": "2024-01-01T00:00:00Z",
+                "rev_id": rev_id,
+                "rev_timestamp": "2024-01-02 03:04:05",
+                "rev_parent_id": rev_id - 1,
+                "comment_text": "Repeat edit",
+                "rev_sha1": f"sha{rev_id}",
+                "user_groups": groups,
+                "actor_name": "RepeatUser",
+                "actor_user": 88,
+            }
+            for rev_id, groups in ((41, "user"), (42, "user,autopatrolled"))
+        ]
+        client = WikiClient(self.wiki)
+        with mock.patch.object(
+            client, "ensure_editor_profiles", wraps=client.ensure_editor_profiles
+        ) as ensure_profiles:
+            client.fetch_pending_pages(limit=5)
+
+        ensure_profiles.assert_called_once()
+        self.assertEqual(list(ensure_profiles.call_args.args[0]), ["RepeatUser"])
+        profile = EditorProfile.objects.get(username="RepeatUser")
+        self.assertEqual(profile.usergroups, ["autopatrolled", "user"])
+        self.assertTrue(profile.is_autopatrolled)
+
+    def test_fetch_pending_pages_query_count_does_not_grow_with_rows(self):
+        self.mock_superset.query.return_value = [
+            dict(_PENDING_ROW, fp_page_id=pageid, rev_id=revid, actor_name=user)
+            for pageid, revid, user in ((1, 2, "A"), (1, 3, "B"), (4, 5, "A"), (6, 7, "C"))
+        ]
+        client = WikiClient(self.wiki)
+
+        with self.assertNumQueries(9):
+            client.fetch_pending_pages(limit=10)
+
+        self.assertEqual(PendingPage.objects.count(), 3)
+        self.assertEqual(PendingRevision.objects.count(), 4)
+        self.assertEqual(EditorProfile.objects.count(), 3)
+
+    def test_fetch_pending_pages_keeps_parsed_categories_of_unchanged_revisions(self):
+        self.mock_superset.query.return_value = [
+            _PENDING_ROW,
+            dict(_PENDING_ROW, rev_id=3, rev_sha1="other"),
+        ]
+        client = WikiClient(self.wiki)
+        client.fetch_pending_pages(limit=10)
+        PendingRevision.objects.update(categories=["Parsed"])
+
+        self.mock_superset.query.return_value = [
+            _PENDING_ROW,
+            dict(_PENDING_ROW, rev_id=3, rev_sha1="changed"),
+        ]
+        client.fetch_pending_pages(limit=10)
+
+        self.assertEqual(
+            dict(PendingRevision.objects.values_list("revid", "categories")),
+            {2: ["Parsed"], 3: []},
+        )
+
+    def test_fetch_pending_pages_only_touches_changed_rows(self):
+        self.mock_superset.query.return_value = [
+            _PENDING_ROW,
+            dict(_PENDING_ROW, rev_id=3),
+            dict(_PENDING_ROW, fp_page_id=4, rev_id=5),
+        ]
+        client = WikiClient(self.wiki)
+        client.fetch_pending_pages(limit=10)
+        PendingRevision.objects.update(wikitext="Cached")
+        kept_page = PendingPage.objects.get(pageid=_PENDING_ROW["fp_page_id"])
+        kept_revision = PendingRevision.objects.get(revid=_PENDING_ROW["rev_id"])
+
+        self.mock_superset.query.return_value = [
+            dict(_PENDING_ROW, comment_text="Reworded"),
+            dict(_PENDING_ROW, rev_id=6, comment_text="New edit"),
+        ]
+        client.fetch_pending_pages(limit=10)
+
+        self.assertEqual(list(PendingPage.objects.values_list("pk", flat=True)), [kept_page.pk])
+        revisions = {revision.revid: revision for revision in PendingRevision.objects.all()}
+        self.assertEqual(set(revisions), {_PENDING_ROW["rev_id"], 6})
+        self.assertEqual(revisions[_PENDING_ROW["rev_id"]].pk, kept_revision.pk)
+        self.assertEqual(revisions[_PENDING_ROW["rev_id"]].wikitext, "Cached")
+        self.assertEqual(revisions[_PENDING_ROW["rev_id"]].comment, "Reworded")
+        self.assertEqual(revisions[6].wikitext, "")
+
+    def test_ensure_editor_profiles_creates_and_updates_in_bulk(self):
+        EditorProfile.objects.create(wiki=self.wiki, username="Existing", usergroups=["user"])
+        EditorProfile.objects.create(wiki=self.wiki, username="Untouched", usergroups=["sysop"])
+        client = WikiClient(self.wiki)
+
+        # One lookup, one INSERT for the new editors and one UPDATE for the rest.
+        with self.assertNumQueries(3):
+            client.ensure_editor_profiles(
+                {
+                    "Existing": {"user_groups": ["Autopatrolled"]},
+                    "Untouched": None,
+                    "NewBot": {"user_groups": ["bot"]},
+                    "NewPlain": None,
+                }
+            )
+
+        profiles = {profile.username: profile for profile in EditorProfile.objects.all()}
+        self.assertEqual(profiles["Existing"].normalized_usergroups, ["autopatrolled"])
+        self.assertTrue(profiles["Existing"].is_autopatrolled)
+        self.assertEqual(profiles["Untouched"].usergroups, ["sysop"])
+        self.assertTrue(profiles["NewBot"].is_bot)
+        self.assertEqual(profiles["NewPlain"].usergroups, [])
+        self.assertFalse(profiles["NewPlain"].is_autoreviewed)
+
     def test_ensure_editor_profile_marks_additional_autoreview_groups(self):
         client = WikiClient(self.wiki)
         profile = client.ensure_editor_profile(
@@ -185,59 +358,100 @@ class WikiClientTests(TestCase):
         )
 
         self.assertEqual(profile.usergroups, ["Editor", "Reviewer", "Sysop"])
+        self.assertEqual(profile.normalized_usergroups, ["editor", "reviewer", "sysop"])
         self.assertTrue(profile.is_autoreviewed)
         self.assertFalse(profile.is_autopatrolled)
         self.assertFalse(profile.is_bot)
 
 
-class RefreshWorkflowTests(TestCase):
-    @mock.patch("reviews.services.SupersetQuery")
-    @mock.patch("reviews.services.pywikibot.Site")
-    def test_refresh_handles_errors(self, mock_site, mock_superset):
-        wiki = Wiki.objects.create(
-            name="Test Wiki",
-            code="test",
-            api_endpoint="https://test.example/api.php",
+class PrefetchWikitextTests(BaseReviewsTestCase):
+    @mock.patch("reviews.services.WIKITEXT_BATCH_SIZE", 1)
+    @mock.patch("pywikibot.Site")
+    def test_prefetch_fetches_batches_and_stores_results(self, mock_site):
+        page = PendingPage.objects.create(wiki=self.wiki, pageid=1, title="Page", stable_revid=1)
+        PendingRevision.objects.bulk_create(
+            [
+                PendingRevision(
+                    page=page,
+                    revid=revid,
+                    timestamp=self.now,
+                    age_at_fetch=timedelta(0),
+                    sha1=f"hash{revid}",
+                    wikitext="",
+                )
+                for revid in (2, 3)
+            ]
         )
+
+        def simple_request(**kwargs):
+            revid = int(kwargs["revids"])
+            request = mock.Mock()
+            request.submit.return_value = {
+                "query": {
+                    "pages": [
+                        {
+                            "revisions": [
+                                {
+                                    "revid": revid,
+                                    "slots": {"main": {"content": f"[[Category:C{revid}]]"}},
+                                }
+                            ]
+                        }
+                    ]
+                }
+            }
+            return request
+
+        mock_site.return_value.simple_request.side_effect = simple_request
+        prefetch_revision_wikitext(PendingRevision.objects.select_related("page__wiki"))
+
+        self.assertEqual(mock_site.return_value.simple_request.call_count, 2)
+        self.assertEqual(
+            dict(PendingRevision.objects.values_list("revid", "categories")),
+            {2: ["C2"], 3: ["C3"]},
+        )
+
+
+class RefreshWorkflowTests(BaseReviewsTestCase):
+    @mock.patch("pywikibot.data.superset.SupersetQuery")
+    @mock.patch("pywikibot.Site")
+    def test_refresh_handles_errors(self, mock_site, mock_superset):
         fake_site = FakeSite()
         fake_site.response = {"query": {"pages": []}}
         mock_site.return_value = fake_site
         mock_superset.return_value.query.side_effect = RuntimeError("boom")
-        client = WikiClient(wiki)
+        client = WikiClient(self.wiki)
         with self.assertRaises(RuntimeError):
             client.refresh()
 
-    @mock.patch("reviews.services.SupersetQuery")
-    @mock.patch("reviews.services.pywikibot.Site")
+    @mock.patch("pywikibot.data.superset.SupersetQuery")
+    @mock.patch("pywikibot.Site")
     def test_refresh_does_not_call_pywikibot_requests(
         self, mock_site, mock_superset
     ):
-        wiki = Wiki.objects.create(
-            name="Test Wiki",
-            code="test",
-            api_endpoint="https://test.example/api.php",
-        )
         fake_site = FakeSite()
         mock_site.return_value = fake_site
-        mock_superset.return_value.query.return_value = [
-            {
-                "fp_page_id": 1,
-                "page_title": "Page",
-                "fp_stable": 1,
-                "fp_pending_since": "2024-01-01T00:00:00Z",
-                "rev_id": 2,
-                "rev_timestamp": "2024-01-01 01:00:00",
-                "rev_parent_id": 1,
-                "comment_text": "Edit",
-                "rev_sha1": "hash",
-                "change_tags": "tag",
-                "user_groups": "user",
-                "actor_name": "User",
-                "actor_user": 5,
-            }
-        ]
+        mock_superset.return_value.query.return_value = [_PENDING_ROW]
 
-        client = WikiClient(wiki)
+        client = WikiClient(self.wiki)
         client.refresh()
         self.assertEqual(fake_site.requests, [])
         self.assertEqual(PendingRevision.objects.count(), 1)
+
+    @mock.patch("pywikibot.data.superset.SupersetQuery")
+    @mock.patch("pywikibot.Site")
+    def test_refresh_reuses_recently_fetched_pages(self, mock_site, mock_superset):
+        mock_site.return_value = FakeSite()
+        mock_superset.return_value.query.return_value = [_PENDING_ROW]
+
+        client = WikiClient(self.wiki)
+        first_pages = client.refresh()
+        second_pages = client.refresh()
+        self.assertEqual(mock_superset.return_value.query.call_count, 1)
+        self.assertEqual(
+            [page.pageid for page in second_pages],
+            [page.pageid for page in first_pages],
+        )
+
+        client.refresh(force=True)
+        self.assertEqual(mock_superset.return_value.query.call_count, 2)
@@ -1,10 +1,13 @@
 from __future__ import annotations
 
 import json
-from datetime import datetime, timedelta, timezone
+from datetime import timedelta
+from types import MappingProxyType
 from unittest import mock
 
-from django.test import Client, TestCase
+from django.db import connection
+from django.http import HttpResponse
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from reviews.models import (
@@ -14,39 +17,117 @@ from reviews.models import (
     Wiki,
     WikiConfiguration,
 )
+from reviews.services import WikiClient
+from reviews.views import MAX_AUTOREVIEW_PAGES
+from reviews.tests.base import BaseReviewsTestCase
+
+# Superset metadata of the revisions in the listing tests, shared read-only.
+_SUPERSET_AUTOPATROLLED = MappingProxyType(
+    {
+        "user_groups": ["user", "autopatrolled"],
+        "change_tags": ["tag"],
+        "page_categories": ["Cat"],
+        "rc_bot": False,
+    }
+)
+_SUPERSET_AUTOREVIEWER = MappingProxyType(
+    {
+        "user_groups": ["editor", "autoreviewer"],
+        "change_tags": ["foo"],
+        "page_categories": ["Bar"],
+        "rc_bot": False,
+    }
+)
 
 
-class ViewTests(TestCase):
-    def setUp(self):
-        self.client = Client()
-        self.wiki = Wiki.objects.create(
-            name="Example Wiki",
-            code="ex",
-            api_endpoint="https://example.org/api.php",
-        )
-        WikiConfiguration.objects.create(wiki=self.wiki)
+def _create_revisions(revisions: list[PendingRevision]) -> list[PendingRevision]:
+    # One INSERT for several rows; bulk_create skips save(), so derive the
+    # Superset fields here like save() does.
+    for revision in revisions:
+        revision.sync_superset_fields()
+    return PendingRevision.objects.bulk_create(revisions)
+
+
+class ViewTests(BaseReviewsTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # The per-wiki endpoints do not change between tests.
+        cls.url_refresh = reverse("api_refresh", args=[cls.wiki.pk])
+        cls.url_pending = reverse("api_pending", args=[cls.wiki.pk])
+        cls.url_clear_cache = reverse("api_clear_cache", args=[cls.wiki.pk])
+        cls.url_configuration = reverse("api_configuration", args=[cls.wiki.pk])
+        cls.url_autoreview_pages = reverse("api_autoreview_pages", args=[cls.wiki.pk])
 
     def test_index_creates_default_wiki_if_missing(self):
         Wiki.objects.all().delete()
-        response = self.client.get(reverse("index"))
+        # The seeding is what is under test, so skip rendering the page shell.
+        with mock.patch("reviews.views.render", return_value=HttpResponse()) as render:
+            response = self.client.get(reverse("index"))
         self.assertEqual(response.status_code, 200)
-        self.assertContains(response, "Pending Changes Review")
+        initial_wikis = render.call_args.args[2]["initial_wikis"]
+        self.assertCountEqual(
+            [wiki["code"] for wiki in initial_wikis], ["de", "en", "pl", "fi"]
+        )
         codes = list(Wiki.objects.values_list("code", flat=True))
         self.assertCountEqual(codes, ["de", "en", "pl", "fi"])
+        self.assertEqual(WikiConfiguration.objects.count(), 4)
+
+    def test_index_lists_existing_wikis_in_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("index"))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Pending Changes Review")
+
+    def test_api_wikis_lists_wikis_with_configuration(self):
+        config = self.wiki.configuration
+        config.blocking_categories = ["Foo"]
+        config.save(update_fields=["blocking_categories"])
+        Wiki.objects.create(
+            name="Unconfigured Wiki",
+            code="un",
+            api_endpoint="https://un.example.org/api.php",
+        )
+
+        response = self.client.get(reverse("api_wikis"))
+        self.assertEqual(response.status_code, 200)
+        wikis = {wiki["code"]: wiki for wiki in response.json()["wikis"]}
+        self.assertEqual(wikis["ex"]["configuration"]["blocking_categories"], ["Foo"])
+        self.assertEqual(
+            wikis["un"]["configuration"],
+            {"blocking_categories": [], "auto_approved_groups": []},
+        )
 
-    @mock.patch("reviews.views.WikiClient")
-    def test_api_refresh_returns_error_on_failure(self, mock_client):
-        mock_client.return_value.refresh.side_effect = RuntimeError("failure")
-        response = self.client.post(reverse("api_refresh", args=[self.wiki.pk]))
+    def test_api_wikis_lists_wikis_in_one_query(self):
+        for code in ("aa", "bb"):
+            wiki = Wiki.objects.create(
+                name=f"Wiki {code}",
+                code=code,
+                api_endpoint=f"https://{code}.example.org/api.php",
+            )
+            WikiConfiguration.objects.create(wiki=wiki)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("api_wikis"))
+
+        self.assertEqual(len(response.json()["wikis"]), 3)
+
+    # WikiClient.__init__ builds a pywikibot site, so that is faked alongside.
+    @mock.patch("pywikibot.Site")
+    @mock.patch.object(WikiClient, "refresh")
+    def test_api_refresh_returns_error_on_failure(self, mock_refresh, mock_site):
+        mock_refresh.side_effect = RuntimeError("failure")
+        response = self.client.post(self.url_refresh)
         self.assertEqual(response.status_code, 502)
         self.assertIn("error", response.json())
 
-    @mock.patch("reviews.views.WikiClient")
-    def test_api_refresh_success(self, mock_client):
-        mock_client.return_value.refresh.return_value = []
-        response = self.client.post(reverse("api_refresh", args=[self.wiki.pk]))
+    @mock.patch("pywikibot.Site")
+    @mock.patch.object(WikiClient, "refresh")
+    def test_api_refresh_success(self, mock_refresh, mock_site):
+        mock_refresh.return_value = []
+        response = self.client.post(self.url_refresh)
         self.assertEqual(response.status_code, 200)
-        self.assertIn("pages", response.json())
+        self.assertJSONEqual(response.content, {"pages": []})
 
     def test_api_pending_returns_cached_revisions(self):
         page = PendingPage.objects.create(
@@ -62,8 +143,8 @@ class ViewTests(TestCase):
             parentid=None,
             user_name="Stabilizer",
             user_id=9,
-            timestamp=datetime.now(timezone.utc) - timedelta(hours=3),
-            fetched_at=datetime.now(timezone.utc),
+            timestamp=self.now - timedelta(hours=3),
+            fetched_at=self.now,
             age_at_fetch=timedelta(hours=3),
             sha1="stable",
             comment="Stable revision",
@@ -77,22 +158,18 @@ class ViewTests(TestCase):
             parentid=1,
             user_name="User",
             user_id=10,
-            timestamp=datetime.now(timezone.utc) - timedelta(hours=2),
-            fetched_at=datetime.now(timezone.utc),
+            timestamp=self.now - timedelta(hours=2),
+            fetched_at=self.now,
             age_at_fetch=timedelta(hours=2),
             sha1="hash",
             comment="Comment",
             change_tags=[],
             wikitext="",
             categories=[],
-            superset_data={
-                "user_groups": ["user", "autopatrolled"],
-                "change_tags": ["tag"],
-                "page_categories": ["Cat"],
-                "rc_bot": False,
-            },
-        )
-        response = self.client.get(reverse("api_pending", args=[self.wiki.pk]))
+            superset_data=dict(_SUPERSET_AUTOPATROLLED),
+        )
+        with self.assertNumQueries(4):
+            response = self.client.get(self.url_pending)
         payload = response.json()
         self.assertEqual(len(payload["pages"]), 1)
         revisions = payload["pages"][0]["revisions"]
@@ -103,6 +180,120 @@ class ViewTests(TestCase):
         self.assertEqual(rev_payload["change_tags"], ["tag"])
         self.assertEqual(rev_payload["categories"], ["Cat"])
 
+    def test_revision_age_is_measured_at_last_refresh(self):
+        page = PendingPage.objects.create(
+            wiki=self.wiki, pageid=1, title="Page", stable_revid=1
+        )
+        # Kept revisions keep the age of the poll that first stored them.
+        PendingRevision.objects.create(
+            page=page,
+            revid=2,
+            timestamp=self.now - timedelta(hours=2),
+            age_at_fetch=timedelta(0),
+            sha1="hash",
+        )
+        PendingPage.objects.filter(pk=page.pk).update(fetched_at=self.now)
+        url = reverse("api_page_revisions", args=[self.wiki.pk, page.pageid])
+
+        pending = self.client.get(self.url_pending).json()
+        self.assertEqual(pending["pages"][0]["revisions"][0]["age_seconds"], 7200)
+        page_revisions = self.client.get(url).json()
+        self.assertEqual(page_revisions["revisions"][0]["age_seconds"], 7200)
+
+    def test_api_pending_query_count_does_not_grow_with_pages(self):
+        pages = PendingPage.objects.bulk_create(
+            [
+                PendingPage(wiki=self.wiki, pageid=pageid, title=f"Page {pageid}", stable_revid=1)
+                for pageid in (11, 12, 13)
+            ]
+        )
+        _create_revisions(
+            [
+                PendingRevision(
+                    page=page,
+                    revid=page.pageid * 10,
+                    parentid=1,
+                    user_name=f"Editor {page.pageid}",
+                    timestamp=self.now - timedelta(hours=1),
+                    age_at_fetch=timedelta(hours=1),
+                    sha1=f"sha-{page.pageid}",
+                )
+                for page in pages
+            ]
+        )
+        EditorProfile.objects.bulk_create(
+            [EditorProfile(wiki=self.wiki, username=f"Editor {page.pageid}") for page in pages]
+        )
+
+        # The wiki, its pages, their revisions and the editor profiles.
+        with self.assertNumQueries(4):
+            response = self.client.get(self.url_pending)
+
+        self.assertEqual(len(response.json()["pages"]), 3)
+
+    def test_api_pending_leaves_wikitext_unloaded(self):
+        page = PendingPage.objects.create(
+            wiki=self.wiki,
+            pageid=21,
+            title="Long Page",
+            stable_revid=1,
+        )
+        PendingRevision.objects.create(
+            page=page,
+            revid=22,
+            parentid=1,
+            user_name="Writer",
+            timestamp=self.now - timedelta(hours=1),
+            age_at_fetch=timedelta(hours=1),
+            sha1="long",
+            wikitext="Long article text",
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url_pending)
+
+        revision_payload = response.json()["pages"][0]["revisions"][0]
+        self.assertNotIn("wikitext", revision_payload)
+        self.assertNotIn(b"Long article text", response.content)
+        revision_selects = [
+            query["sql"]
+            for query in queries.captured_queries
+            if 'FROM "reviews_pendingrevision"' in query["sql"]
+        ]
+        self.assertEqual(len(revision_selects), 1)
+        self.assertNotIn('"wikitext"', revision_selects[0])
+
+    def test_api_pending_emits_non_ascii_titles_unescaped(self):
+        PendingPage.objects.create(
+            wiki=self.wiki,
+            pageid=2,
+            title="Äänestys",
+            stable_revid=1,
+        )
+        response = self.client.get(self.url_pending)
+        self.assertIn("Äänestys".encode("utf-8"), response.content)
+        self.assertNotIn(b", ", response.content)
+        self.assertNotIn(b": ", response.content)
+        self.assertEqual(response.json()["pages"][0]["title"], "Äänestys")
+
+    def test_api_pending_supports_conditional_requests(self):
+        response = self.client.get(self.url_pending)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("no-cache", response["Cache-Control"])
+        etag = response["ETag"]
+
+        cached_response = self.client.get(self.url_pending, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached_response.status_code, 304)
+
+        PendingPage.objects.create(
+            wiki=self.wiki,
+            pageid=3,
+            title="New",
+            stable_revid=1,
+        )
+        changed_response = self.client.get(self.url_pending, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed_response.status_code, 200)
+
     def test_api_page_revisions_returns_revision_payload(self):
         page = PendingPage.objects.create(
             wiki=self.wiki,
@@ -117,8 +308,8 @@ class ViewTests(TestCase):
             parentid=None,
             user_name="Stabilizer",
             user_id=9,
-            timestamp=datetime.now(timezone.utc) - timedelta(hours=6),
-            fetched_at=datetime.now(timezone.utc),
+            timestamp=self.now - timedelta(hours=6),
+            fetched_at=self.now,
             age_at_fetch=timedelta(hours=6),
             sha1="stable",
             comment="Stable revision",
@@ -132,24 +323,21 @@ class ViewTests(TestCase):
             parentid=3,
             user_name="Another",
             user_id=20,
-            timestamp=datetime.now(timezone.utc) - timedelta(minutes=30),
-            fetched_at=datetime.now(timezone.utc),
+            timestamp=self.now - timedelta(minutes=30),
+            fetched_at=self.now,
             age_at_fetch=timedelta(minutes=30),
             sha1="sha",
             comment="More",
             change_tags=[],
             wikitext="",
             categories=[],
-            superset_data={
-                "user_groups": ["editor", "autoreviewer"],
-                "change_tags": ["foo"],
-                "page_categories": ["Bar"],
-                "rc_bot": False,
-            },
+            superset_data=dict(_SUPERSET_AUTOREVIEWER),
         )
 
         url = reverse("api_page_revisions", args=[self.wiki.pk, page.pageid])
-        response = self.client.get(url)
+        # The wiki, the page, its revisions and the editor profiles.
+        with self.assertNumQueries(4):
+            response = self.client.get(url)
         self.assertEqual(response.status_code, 200)
         data = response.json()
         self.assertEqual(data["pageid"], page.pageid)
@@ -167,23 +355,50 @@ class ViewTests(TestCase):
             title="Page",
             stable_revid=1,
         )
-        response = self.client.post(reverse("api_clear_cache", args=[self.wiki.pk]))
+        response = self.client.post(self.url_clear_cache)
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(PendingPage.objects.count(), 0)
+        self.assertFalse(PendingPage.objects.filter(wiki=self.wiki).exists())
 
     def test_api_configuration_updates_settings(self):
-        url = reverse("api_configuration", args=[self.wiki.pk])
         payload = {
             "blocking_categories": ["Foo"],
             "auto_approved_groups": ["sysop"],
         }
-        response = self.client.put(url, data=json.dumps(payload), content_type="application/json")
+        response = self.client.put(
+            self.url_configuration, data=json.dumps(payload), content_type="application/json"
+        )
         self.assertEqual(response.status_code, 200)
+        self.assertJSONEqual(response.content, payload)
         config = self.wiki.configuration
         config.refresh_from_db()
         self.assertEqual(config.blocking_categories, ["Foo"])
         self.assertEqual(config.auto_approved_groups, ["sysop"])
 
+    def test_api_configuration_skips_unchanged_settings(self):
+        payload = {"blocking_categories": [], "auto_approved_groups": []}
+        with mock.patch.object(WikiConfiguration, "save") as save:
+            response = self.client.put(
+                self.url_configuration, data=json.dumps(payload), content_type="application/json"
+            )
+        self.assertEqual(response.status_code, 200)
+        save.assert_not_called()
+
+    def test_api_configuration_rejects_non_string_values(self):
+        payload = {"blocking_categories": [1, 2], "auto_approved_groups": ["sysop"]}
+        response = self.client.put(
+            self.url_configuration, data=json.dumps(payload), content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.wiki.configuration.refresh_from_db()
+        self.assertEqual(self.wiki.configuration.auto_approved_groups, [])
+
+    def test_api_configuration_rejects_malformed_json(self):
+        response = self.client.put(
+            self.url_configuration, data="{not json", content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("error", response.json())
+
     def test_api_autoreview_marks_bot_revision_auto_approvable(self):
         page = PendingPage.objects.create(
             wiki=self.wiki,
@@ -197,8 +412,8 @@ class ViewTests(TestCase):
             parentid=150,
             user_name="HelpfulBot",
             user_id=999,
-            timestamp=datetime.now(timezone.utc) - timedelta(days=1),
-            fetched_at=datetime.now(timezone.utc),
+            timestamp=self.now - timedelta(days=1),
+            fetched_at=self.now,
             age_at_fetch=timedelta(days=1),
             sha1="hash",
             comment="Automated edit",
@@ -237,8 +452,8 @@ class ViewTests(TestCase):
             parentid=150,
             user_name="AdminUser",
             user_id=1000,
-            timestamp=datetime.now(timezone.utc) - timedelta(hours=5),
-            fetched_at=datetime.now(timezone.utc),
+            timestamp=self.now - timedelta(hours=5),
+            fetched_at=self.now,
             age_at_fetch=timedelta(hours=5),
             sha1="hash2",
             comment="Admin edit",
@@ -270,8 +485,8 @@ class ViewTests(TestCase):
             parentid=300,
             user_name="AutoUser",
             user_id=3001,
-            timestamp=datetime.now(timezone.utc) - timedelta(hours=4),
-            fetched_at=datetime.now(timezone.utc),
+            timestamp=self.now - timedelta(hours=4),
+            fetched_at=self.now,
             age_at_fetch=timedelta(hours=4),
             sha1="hash5",
             comment="Edit",
@@ -309,8 +524,8 @@ class ViewTests(TestCase):
             parentid=300,
             user_name="ReviewUser",
             user_id=3002,
-            timestamp=datetime.now(timezone.utc) - timedelta(hours=3),
-            fetched_at=datetime.now(timezone.utc),
+            timestamp=self.now - timedelta(hours=3),
+            fetched_at=self.now,
             age_at_fetch=timedelta(hours=3),
             sha1="hash6",
             comment="Reviewer edit",
@@ -335,7 +550,7 @@ class ViewTests(TestCase):
         self.assertEqual(result["tests"][1]["status"], "ok")
         self.assertEqual(result["tests"][1]["id"], "auto-approved-group")
 
-    @mock.patch("reviews.models.pywikibot.Site")
+    @mock.patch("pywikibot.Site")
     def test_api_autoreview_blocks_on_blocking_categories(self, mock_site):
         config = self.wiki.configuration
         config.blocking_categories = ["Secret"]
@@ -353,8 +568,8 @@ class ViewTests(TestCase):
             parentid=160,
             user_name="RegularUser",
             user_id=1001,
-            timestamp=datetime.now(timezone.utc) - timedelta(hours=3),
-            fetched_at=datetime.now(timezone.utc),
+            timestamp=self.now - timedelta(hours=3),
+            fetched_at=self.now,
             age_at_fetch=timedelta(hours=3),
             sha1="hash3",
             comment="Edit",
@@ -370,6 +585,7 @@ class ViewTests(TestCase):
                     {
                         "revisions": [
                             {
+                                "revid": 202,
                                 "slots": {
                                     "main": {
                                         "content": "Hidden [[Category:Secret]]",
@@ -418,6 +634,107 @@ class ViewTests(TestCase):
         self.assertEqual(second_response.status_code, 200)
         self.assertEqual(len(fake_site.requests), 1)
 
+    @mock.patch("pywikibot.Site")
+    def test_api_autoreview_pages_fetches_wikitext_in_one_request(self, mock_site):
+        config = self.wiki.configuration
+        config.blocking_categories = ["Secret"]
+        config.save(update_fields=["blocking_categories"])
+        pages = PendingPage.objects.bulk_create(
+            [
+                PendingPage(wiki=self.wiki, pageid=pageid, title=f"Page {pageid}", stable_revid=1)
+                for pageid in (103, 104)
+            ]
+        )
+        _create_revisions(
+            [
+                PendingRevision(
+                    page=page,
+                    revid=page.pageid + 100,
+                    user_name="RegularUser",
+                    timestamp=self.now,
+                    age_at_fetch=timedelta(0),
+                    sha1=f"hash{page.pageid + 100}",
+                    wikitext="",
+                )
+                for page in pages
+            ]
+        )
+        simple_request = mock_site.return_value.simple_request
+        simple_request.return_value.submit.return_value = {
+            "query": {
+                "pages": [
+                    {"revisions": [{"revid": 203, "slots": {"main": {"content": "Plain"}}}]},
+                    {
+                        "revisions": [
+                            {"revid": 204, "slots": {"main": {"content": "[[Category:Secret]]"}}}
+                        ]
+                    },
+                ]
+            }
+        }
+
+        response = self.client.post(self.url_autoreview_pages, {"pageids": ["103", "104"]})
+
+        self.assertEqual(response.status_code, 200)
+        simple_request.assert_called_once()
+        self.assertEqual(simple_request.call_args.kwargs["revids"], "203|204")
+        statuses = {
+            page["pageid"]: page["results"][0]["decision"]["status"]
+            for page in response.json()["pages"]
+        }
+        self.assertEqual(statuses, {103: "manual", 104: "blocked"})
+        self.assertEqual(PendingRevision.objects.get(revid=204).categories, ["Secret"])
+
+    @mock.patch("pywikibot.Site")
+    def test_api_autoreview_pages_fetches_wikitext_only_for_blocking_check(self, mock_site):
+        config = self.wiki.configuration
+        config.blocking_categories = ["Secret"]
+        config.save(update_fields=["blocking_categories"])
+        page = PendingPage.objects.create(
+            wiki=self.wiki, pageid=105, title="Page 105", stable_revid=1
+        )
+        _create_revisions(
+            [
+                PendingRevision(
+                    page=page,
+                    revid=205,
+                    user_name="BotUser",
+                    timestamp=self.now,
+                    age_at_fetch=timedelta(0),
+                    sha1="hash205",
+                    wikitext="",
+                    superset_data={"user_groups": ["bot"], "rc_bot": True},
+                ),
+                PendingRevision(
+                    page=page,
+                    revid=206,
+                    user_name="RegularUser",
+                    timestamp=self.now + timedelta(seconds=1),
+                    age_at_fetch=timedelta(0),
+                    sha1="hash206",
+                    wikitext="",
+                ),
+            ]
+        )
+        simple_request = mock_site.return_value.simple_request
+        simple_request.return_value.submit.return_value = {
+            "query": {
+                "pages": [{"revisions": [{"revid": 206, "slots": {"main": {"content": ""}}}]}]
+            }
+        }
+
+        response = self.client.post(self.url_autoreview_pages, {"pageids": [page.pageid]})
+
+        self.assertEqual(response.status_code, 200)
+        # The bot edit is approved before its wikitext is needed, and the blank
+        # wikitext of the other one is not requested again on its own.
+        simple_request.assert_called_once()
+        self.assertEqual(simple_request.call_args.kwargs["revids"], "206")
+        statuses = [
+            result["decision"]["status"] for result in response.json()["pages"][0]["results"]
+        ]
+        self.assertEqual(statuses, ["approve", "manual"])
+
     def test_api_autoreview_requires_manual_review_when_no_rules_apply(self):
         page = PendingPage.objects.create(
             wiki=self.wiki,
@@ -431,8 +748,8 @@ class ViewTests(TestCase):
             parentid=170,
             user_name="Editor",
             user_id=1002,
-            timestamp=datetime.now(timezone.utc) - timedelta(hours=2),
-            fetched_at=datetime.now(timezone.utc),
+            timestamp=self.now - timedelta(hours=2),
+            fetched_at=self.now,
             age_at_fetch=timedelta(hours=2),
             sha1="hash4",
             comment="Edit",
@@ -443,7 +760,9 @@ class ViewTests(TestCase):
         )
 
         url = reverse("api_autoreview", args=[self.wiki.pk, page.pageid])
-        response = self.client.post(url)
+        # The wiki with its configuration, the page, its revisions and profiles.
+        with self.assertNumQueries(4):
+            response = self.client.post(url)
         self.assertEqual(response.status_code, 200)
         result = response.json()["results"][0]
         self.assertEqual(result["decision"]["status"], "manual")
@@ -457,8 +776,8 @@ class ViewTests(TestCase):
             title="Multiple Revisions",
             stable_revid=1,
         )
-        older_timestamp = datetime.now(timezone.utc) - timedelta(days=2)
-        newer_timestamp = datetime.now(timezone.utc) - timedelta(days=1)
+        older_timestamp = self.now - timedelta(days=2)
+        newer_timestamp = self.now - timedelta(days=1)
         PendingRevision.objects.create(
             page=page,
             revid=301,
@@ -466,7 +785,7 @@ class ViewTests(TestCase):
             user_name="Editor1",
             user_id=2001,
             timestamp=older_timestamp,
-            fetched_at=datetime.now(timezone.utc),
+            fetched_at=self.now,
             age_at_fetch=timedelta(days=2),
             sha1="sha-old",
             comment="Old",
@@ -482,7 +801,7 @@ class ViewTests(TestCase):
             user_name="Editor2",
             user_id=2002,
             timestamp=newer_timestamp,
-            fetched_at=datetime.now(timezone.utc),
+            fetched_at=self.now,
             age_at_fetch=timedelta(days=1),
             sha1="sha-new",
             comment="New",
@@ -497,3 +816,134 @@ class ViewTests(TestCase):
         self.assertEqual(response.status_code, 200)
         results = response.json()["results"]
         self.assertEqual([result["revid"] for result in results], [301, 302])
+
+    def test_api_autoreview_pages_evaluates_requested_pages(self):
+        bot_page = PendingPage.objects.create(
+            wiki=self.wiki,
+            pageid=110,
+            title="Bot Batch Page",
+            stable_revid=1,
+        )
+        manual_page = PendingPage.objects.create(
+            wiki=self.wiki,
+            pageid=111,
+            title="Manual Batch Page",
+            stable_revid=500,
+        )
+        skipped_page = PendingPage.objects.create(
+            wiki=self.wiki,
+            pageid=112,
+            title="Skipped Batch Page",
+            stable_revid=1,
+        )
+        PendingRevision.objects.create(
+            page=bot_page,
+            revid=501,
+            parentid=1,
+            user_name="BatchBot",
+            user_id=4001,
+            timestamp=self.now - timedelta(hours=2),
+            fetched_at=self.now,
+            age_at_fetch=timedelta(hours=2),
+            sha1="batch-bot",
+            comment="Bot edit",
+            change_tags=[],
+            wikitext="Some plain text",
+            categories=[],
+            superset_data={"user_groups": ["bot"]},
+        )
+        _create_revisions(
+            [
+                PendingRevision(
+                    page=manual_page,
+                    revid=revid,
+                    parentid=revid - 1,
+                    user_name="BatchEditor",
+                    user_id=4002,
+                    timestamp=self.now - timedelta(hours=hours),
+                    age_at_fetch=timedelta(hours=hours),
+                    sha1=f"batch-{revid}",
+                    comment="Edit",
+                    change_tags=[],
+                    wikitext="Some plain text",
+                    categories=[],
+                    superset_data={"user_groups": ["user"]},
+                )
+                for revid, hours in ((500, 3), (502, 1))
+            ]
+        )
+
+        response = self.client.post(
+            self.url_autoreview_pages,
+            data=json.dumps({"pageids": [bot_page.pageid, manual_page.pageid]}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["mode"], "dry-run")
+        results = {page["pageid"]: page["results"] for page in data["pages"]}
+        self.assertNotIn(skipped_page.pageid, results)
+        self.assertEqual([result["revid"] for result in results[bot_page.pageid]], [501])
+        self.assertEqual(results[bot_page.pageid][0]["decision"]["status"], "approve")
+        self.assertEqual(
+            [result["revid"] for result in results[manual_page.pageid]], [502]
+        )
+        self.assertEqual(results[manual_page.pageid][0]["decision"]["status"], "manual")
+
+    def test_api_autoreview_pages_skips_wikitext_without_blocking_categories(self):
+        page = PendingPage.objects.create(
+            wiki=self.wiki,
+            pageid=120,
+            title="Metadata Page",
+            stable_revid=1,
+        )
+        PendingRevision.objects.create(
+            page=page,
+            revid=601,
+            parentid=1,
+            user_name="MetadataBot",
+            timestamp=self.now - timedelta(hours=1),
+            age_at_fetch=timedelta(hours=1),
+            sha1="metadata",
+            wikitext="Large text",
+            superset_data={"user_groups": ["bot"]},
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url_autoreview_pages, {"pageids": [page.pageid]})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["pages"][0]["results"][0]["decision"]["status"], "approve")
+        revision_selects = [
+            query["sql"]
+            for query in queries.captured_queries
+            if 'FROM "reviews_pendingrevision"' in query["sql"]
+        ]
+        self.assertTrue(revision_selects)
+        for sql in revision_selects:
+            self.assertNotIn('"wikitext"', sql)
+            self.assertNotIn('"superset_data"', sql)
+
+    def test_api_autoreview_pages_rejects_invalid_pageids(self):
+        PendingPage.objects.create(wiki=self.wiki, pageid=12, title="Twelve", stable_revid=1)
+        too_many = list(range(1, MAX_AUTOREVIEW_PAGES + 2))
+        for pageids in (None, [], 5, "12", ["abc"], [True], [1.5], too_many):
+            with self.subTest(pageids=pageids):
+                response = self.client.post(
+                    self.url_autoreview_pages,
+                    data=json.dumps({"pageids": pageids}),
+                    content_type="application/json",
+                )
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("error", response.json())
+
+        response = self.client.post(self.url_autoreview_pages)
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post(
+            self.url_autoreview_pages,
+            data=json.dumps({"pageids": ["12"]}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([page["pageid"] for page in response.json()["pages"]], [12])
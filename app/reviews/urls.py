@@ -1,22 +1,29 @@
-from django.urls import path
+from django.urls import include, path
 
 from . import views
 
-urlpatterns = [
-    path("", views.index, name="index"),
-    path("api/wikis/", views.api_wikis, name="api_wikis"),
-    path("api/wikis/<int:pk>/refresh/", views.api_refresh, name="api_refresh"),
-    path("api/wikis/<int:pk>/pending/", views.api_pending, name="api_pending"),
+# Routes under "api/wikis/<int:pk>/"; the shared prefix is matched once and only
+# the remaining path is compared against these.
+wiki_patterns = [
+    path("refresh/", views.api_refresh, name="api_refresh"),
+    path("pending/", views.api_pending, name="api_pending"),
     path(
-        "api/wikis/<int:pk>/pages/<int:pageid>/revisions/",
+        "pages/<int:pageid>/revisions/",
         views.api_page_revisions,
         name="api_page_revisions",
     ),
     path(
-        "api/wikis/<int:pk>/pages/<int:pageid>/autoreview/",
+        "pages/<int:pageid>/autoreview/",
         views.api_autoreview,
         name="api_autoreview",
     ),
-    path("api/wikis/<int:pk>/clear/", views.api_clear_cache, name="api_clear_cache"),
-    path("api/wikis/<int:pk>/configuration/", views.api_configuration, name="api_configuration"),
+    path("autoreview/", views.api_autoreview_pages, name="api_autoreview_pages"),
+    path("clear/", views.api_clear_cache, name="api_clear_cache"),
+    path("configuration/", views.api_configuration, name="api_configuration"),
+]
+
+urlpatterns = [
+    path("", views.index, name="index"),
+    path("api/wikis/", views.api_wikis, name="api_wikis"),
+    path("api/wikis/<int:pk>/", include(wiki_patterns)),
 ]
@@ -4,46 +4,63 @@ import json
 import logging
 from http import HTTPStatus
 
+from django.db.models import Prefetch
 from django.http import HttpRequest, HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, render
+from django.views.decorators.cache import cache_control
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_GET, require_http_methods
 
-from .autoreview import run_autoreview_for_page
-from .models import EditorProfile, PendingPage, Wiki, WikiConfiguration
+from .autoreview import load_editor_profiles, run_autoreview_for_page, run_autoreview_for_pages
+from .models import EditorProfile, PendingPage, PendingRevision, Wiki, WikiConfiguration
 from .services import WikiClient
 
 logger = logging.getLogger(__name__)
 
+# Groups that mark an editor without a cached profile as autoreviewed.
+_SUPERSET_AUTOREVIEW_GROUPS = frozenset({"autoreview", "autoreviewer"})
+
+
+# Titles, comments and categories are largely non-ASCII on these wikis, so emit
+# UTF-8 directly instead of \u-escaping every such character, and leave out the
+# whitespace after separators, which adds up over the nested revision lists.
+_JSON_DUMPS_PARAMS = {"ensure_ascii": False, "separators": (",", ":")}
+
+# Most pages one batch autoreview request may evaluate.
+MAX_AUTOREVIEW_PAGES = 100
+
+DEFAULT_WIKIS = (
+    {
+        "name": "German Wikipedia",
+        "code": "de",
+        "api_endpoint": "https://de.wikipedia.org/w/api.php",
+    },
+    {
+        "name": "English Wikipedia",
+        "code": "en",
+        "api_endpoint": "https://en.wikipedia.org/w/api.php",
+    },
+    {
+        "name": "Polish Wikipedia",
+        "code": "pl",
+        "api_endpoint": "https://pl.wikipedia.org/w/api.php",
+    },
+    {
+        "name": "Finnish Wikipedia",
+        "code": "fi",
+        "api_endpoint": "https://fi.wikipedia.org/w/api.php",
+    },
+)
+
 
 def index(request: HttpRequest) -> HttpResponse:
     """Render the Vue.js application shell."""
 
-    wikis = Wiki.objects.all().order_by("code")
-    if not wikis.exists():
-        default_wikis = (
-            {
-                "name": "German Wikipedia",
-                "code": "de",
-                "api_endpoint": "https://de.wikipedia.org/w/api.php",
-            },
-            {
-                "name": "English Wikipedia",
-                "code": "en",
-                "api_endpoint": "https://en.wikipedia.org/w/api.php",
-            },
-            {
-                "name": "Polish Wikipedia",
-                "code": "pl",
-                "api_endpoint": "https://pl.wikipedia.org/w/api.php",
-            },
-            {
-                "name": "Finnish Wikipedia",
-                "code": "fi",
-                "api_endpoint": "https://fi.wikipedia.org/w/api.php",
-            },
-        )
-        for defaults in default_wikis:
+    wikis = Wiki.objects.select_related("configuration").order_by("code")
+    # Evaluate the listing once instead of probing it with exists() first.
+    wiki_list = list(wikis)
+    if not wiki_list:
+        for defaults in DEFAULT_WIKIS:
             wiki, _ = Wiki.objects.get_or_create(
                 code=defaults["code"],
                 defaults={
@@ -52,22 +69,14 @@ def index(request: HttpRequest) -> HttpResponse:
                 },
             )
             WikiConfiguration.objects.get_or_create(wiki=wiki)
-        wikis = Wiki.objects.all().order_by("code")
+        wiki_list = list(wikis.all())
     payload = []
-    for wiki in wikis:
-        configuration, _ = WikiConfiguration.objects.get_or_create(wiki=wiki)
-        payload.append(
-            {
-                "id": wiki.id,
-                "name": wiki.name,
-                "code": wiki.code,
-                "api_endpoint": wiki.api_endpoint,
-                "configuration": {
-                    "blocking_categories": configuration.blocking_categories,
-                    "auto_approved_groups": configuration.auto_approved_groups,
-                },
-            }
-        )
+    for wiki in wiki_list:
+        try:
+            configuration = wiki.configuration
+        except WikiConfiguration.DoesNotExist:
+            configuration = WikiConfiguration.objects.get_or_create(wiki=wiki)[0]
+        payload.append(_wiki_payload(wiki, configuration))
     return render(
         request,
         "reviews/index.html",
@@ -78,32 +87,86 @@ def index(request: HttpRequest) -> HttpResponse:
 
 
 @require_GET
+@cache_control(private=True, no_cache=True)
 def api_wikis(request: HttpRequest) -> JsonResponse:
-    payload = []
-    for wiki in Wiki.objects.all().order_by("code"):
-        configuration = getattr(wiki, "configuration", None)
-        payload.append(
-            {
-                "id": wiki.id,
-                "name": wiki.name,
-                "code": wiki.code,
-                "api_endpoint": wiki.api_endpoint,
-                "configuration": {
-                    "blocking_categories": (
-                        configuration.blocking_categories if configuration else []
-                    ),
-                    "auto_approved_groups": (
-                        configuration.auto_approved_groups if configuration else []
-                    ),
-                },
-            }
-        )
-    return JsonResponse({"wikis": payload})
+    payload = [
+        _wiki_payload(wiki, getattr(wiki, "configuration", None))
+        for wiki in Wiki.objects.select_related("configuration").order_by("code")
+    ]
+    return _json_response({"wikis": payload})
+
+
+def _json_response(payload: dict, **kwargs) -> JsonResponse:
+    return JsonResponse(payload, json_dumps_params=_JSON_DUMPS_PARAMS, **kwargs)
+
+
+def _json_body(request: HttpRequest) -> dict | None:
+    # json.loads detects the encoding of bytes itself, so skip the decode copy.
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        return None
+    return payload if isinstance(payload, dict) else None
+
+
+def _string_list(value) -> list[str] | None:
+    # A single string is accepted as a one-item list; other shapes are rejected.
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, list) and all(isinstance(item, str) for item in value):
+        return value
+    return None
+
+
+def _pageid_list(value) -> list[int] | None:
+    # JSON bodies send numbers and form posts send digit strings; anything else,
+    # including an empty or oversized list, is rejected.
+    if not isinstance(value, list) or not 0 < len(value) <= MAX_AUTOREVIEW_PAGES:
+        return None
+    pageids = []
+    for item in value:
+        if type(item) is int:
+            pageids.append(item)
+        elif isinstance(item, str) and item.isdecimal():
+            pageids.append(int(item))
+        else:
+            return None
+    return pageids
+
+
+def _invalid_json_response() -> JsonResponse:
+    return _json_response(
+        {"error": "Request body must be a JSON object."},
+        status=HTTPStatus.BAD_REQUEST,
+    )
+
+
+def _wiki_payload(wiki: Wiki, configuration: WikiConfiguration | None) -> dict:
+    return {
+        "id": wiki.id,
+        "name": wiki.name,
+        "code": wiki.code,
+        "api_endpoint": wiki.api_endpoint,
+        "configuration": {
+            "blocking_categories": (
+                configuration.blocking_categories if configuration else []
+            ),
+            "auto_approved_groups": (
+                configuration.auto_approved_groups if configuration else []
+            ),
+        },
+    }
 
 
 def _get_wiki(pk: int) -> Wiki:
-    wiki = get_object_or_404(Wiki, pk=pk)
-    WikiConfiguration.objects.get_or_create(wiki=wiki)
+    """Return the wiki with its configuration loaded, creating one if missing."""
+
+    wiki = get_object_or_404(Wiki.objects.select_related("configuration"), pk=pk)
+    try:
+        wiki.configuration
+    except WikiConfiguration.DoesNotExist:
+        # get_or_create, as a concurrent first request may create it meanwhile.
+        wiki.configuration = WikiConfiguration.objects.get_or_create(wiki=wiki)[0]
     return wiki
 
 
@@ -116,37 +179,28 @@ def api_refresh(request: HttpRequest, pk: int) -> JsonResponse:
         pages = client.refresh()
     except Exception as exc:  # pragma: no cover - network failures handled in UI
         logger.exception("Failed to refresh pending changes for %s", wiki.code)
-        return JsonResponse(
+        return _json_response(
             {"error": str(exc)},
             status=HTTPStatus.BAD_GATEWAY,
         )
-    return JsonResponse({"pages": [page.pageid for page in pages]})
+    return _json_response({"pages": [page.pageid for page in pages]})
 
 
-def _build_revision_payload(revisions, wiki):
-    usernames: set[str] = {
-        revision.user_name
-        for revision in revisions
-        if revision.user_name
-    }
-    profiles = {
-        profile.username: profile
-        for profile in EditorProfile.objects.filter(
-            wiki=wiki, username__in=usernames
-        )
-    }
+def _metadata_revisions() -> Prefetch:
+    # Revision listings serialise metadata only, so leave the wikitext unloaded.
+    # Built per call: prefetching mutates the Prefetch, so it cannot be shared.
+    return Prefetch("revisions", queryset=PendingRevision.objects.metadata_only())
 
+
+def _build_revision_payload(revisions, profiles: dict[str, EditorProfile]):
     payload: list[dict] = []
     for revision in revisions:
         if revision.page and revision.revid == revision.page.stable_revid:
             continue
         profile = profiles.get(revision.user_name)
         superset_data = revision.superset_data or {}
-        user_groups = profile.usergroups if profile else superset_data.get("user_groups", [])
-        if not user_groups:
-            user_groups = []
-        group_set = set(user_groups)
-        revision_categories = list(revision.categories or [])
+        # The payload is serialised straight away, so stored lists need no copy.
+        revision_categories = revision.categories
         if revision_categories:
             categories = revision_categories
         else:
@@ -167,7 +221,11 @@ def _build_revision_payload(revisions, wiki):
                 "revid": revision.revid,
                 "parentid": revision.parentid,
                 "timestamp": revision.timestamp.isoformat(),
-                "age_seconds": int(revision.age_at_fetch.total_seconds()),
+                # Measured at the page's last refresh; ``age_at_fetch`` is only
+                # set when a revision is first stored.
+                "age_seconds": int(
+                    (revision.page.fetched_at - revision.timestamp).total_seconds()
+                ),
                 "user_name": revision.user_name,
                 "change_tags": revision.change_tags
                 if revision.change_tags
@@ -175,40 +233,52 @@ def _build_revision_payload(revisions, wiki):
                 "comment": revision.comment,
                 "categories": categories,
                 "sha1": revision.sha1,
-                "editor_profile": {
-                    "usergroups": user_groups,
-                    "is_blocked": (
-                        profile.is_blocked
-                        if profile
-                        else bool(superset_data.get("user_blocked", False))
-                    ),
-                    "is_bot": (
-                        profile.is_bot
-                        if profile
-                        else ("bot" in group_set or bool(superset_data.get("rc_bot")))
-                    ),
-                    "is_autopatrolled": (
-                        profile.is_autopatrolled
-                        if profile
-                        else ("autopatrolled" in group_set)
-                    ),
-                    "is_autoreviewed": (
-                        profile.is_autoreviewed
-                        if profile
-                        else bool(group_set & {"autoreview", "autoreviewer"})
-                    ),
-                },
+                "editor_profile": _editor_profile_payload(profile, superset_data),
             }
         )
     return payload
 
 
+def _editor_profile_payload(profile: EditorProfile | None, superset_data: dict) -> dict:
+    if profile is not None:
+        return {
+            "usergroups": profile.usergroups or [],
+            "is_blocked": profile.is_blocked,
+            "is_bot": profile.is_bot,
+            "is_autopatrolled": profile.is_autopatrolled,
+            "is_autoreviewed": profile.is_autoreviewed,
+        }
+
+    # Only editors without a cached profile need their Superset groups probed.
+    user_groups = superset_data.get("user_groups") or []
+    group_set = set(user_groups)
+    return {
+        "usergroups": user_groups,
+        "is_blocked": bool(superset_data.get("user_blocked", False)),
+        "is_bot": "bot" in group_set or bool(superset_data.get("rc_bot")),
+        "is_autopatrolled": "autopatrolled" in group_set,
+        "is_autoreviewed": not _SUPERSET_AUTOREVIEW_GROUPS.isdisjoint(group_set),
+    }
+
+
 @require_GET
+@cache_control(private=True, no_cache=True)
 def api_pending(request: HttpRequest, pk: int) -> JsonResponse:
     wiki = _get_wiki(pk)
+    pages = list(PendingPage.objects.filter(wiki=wiki).prefetch_related(_metadata_revisions()))
+    # Load the editors of every page together rather than once per page.
+    profiles = load_editor_profiles(
+        wiki.pk,
+        {
+            revision.user_name
+            for page in pages
+            for revision in page.revisions.all()
+            if revision.user_name
+        },
+    )
     pages_payload = []
-    for page in PendingPage.objects.filter(wiki=wiki).prefetch_related("revisions"):
-        revisions_payload = _build_revision_payload(page.revisions.all(), wiki)
+    for page in pages:
+        revisions_payload = _build_revision_payload(page.revisions.all(), profiles)
         pages_payload.append(
             {
                 "pageid": page.pageid,
@@ -218,19 +288,24 @@ def api_pending(request: HttpRequest, pk: int) -> JsonResponse:
                 "revisions": revisions_payload,
             }
         )
-    return JsonResponse({"pages": pages_payload})
+    return _json_response({"pages": pages_payload})
 
 
 @require_GET
+@cache_control(private=True, no_cache=True)
 def api_page_revisions(request: HttpRequest, pk: int, pageid: int) -> JsonResponse:
     wiki = _get_wiki(pk)
     page = get_object_or_404(
-        PendingPage.objects.prefetch_related("revisions"),
+        PendingPage.objects.prefetch_related(_metadata_revisions()),
         wiki=wiki,
         pageid=pageid,
     )
-    revisions_payload = _build_revision_payload(page.revisions.all(), wiki)
-    return JsonResponse(
+    revisions = page.revisions.all()
+    profiles = load_editor_profiles(
+        wiki.pk, {revision.user_name for revision in revisions if revision.user_name}
+    )
+    revisions_payload = _build_revision_payload(revisions, profiles)
+    return _json_response(
         {
             "pageid": page.pageid,
             "revisions": revisions_payload,
@@ -242,13 +317,10 @@ def api_page_revisions(request: HttpRequest, pk: int, pageid: int) -> JsonRespon
 @require_http_methods(["POST"])
 def api_autoreview(request: HttpRequest, pk: int, pageid: int) -> JsonResponse:
     wiki = _get_wiki(pk)
-    page = get_object_or_404(
-        PendingPage.objects.prefetch_related("revisions"),
-        wiki=wiki,
-        pageid=pageid,
-    )
-    results = run_autoreview_for_page(page)
-    return JsonResponse(
+    # The autoreview run loads the page's revisions itself.
+    page = get_object_or_404(PendingPage, wiki=wiki, pageid=pageid)
+    results = list(run_autoreview_for_page(page, wiki.configuration))
+    return _json_response(
         {
             "pageid": page.pageid,
             "title": page.title,
@@ -258,12 +330,67 @@ def api_autoreview(request: HttpRequest, pk: int, pageid: int) -> JsonResponse:
     )
 
 
+@csrf_exempt
+@require_http_methods(["POST"])
+def api_autoreview_pages(request: HttpRequest, pk: int) -> JsonResponse:
+    wiki = _get_wiki(pk)
+    if request.content_type == "application/json" and request.body:
+        body = _json_body(request)
+        if body is None:
+            return _invalid_json_response()
+        pageids = _pageid_list(body.get("pageids"))
+    else:
+        pageids = _pageid_list(request.POST.getlist("pageids"))
+    if pageids is None:
+        return _json_response(
+            {
+                "error": (
+                    f"pageids must be a list of 1 to {MAX_AUTOREVIEW_PAGES} page ids."
+                )
+            },
+            status=HTTPStatus.BAD_REQUEST,
+        )
+    pages = list(
+        PendingPage.objects.filter(wiki=wiki, pageid__in=pageids)
+        .select_related("wiki")
+        .prefetch_related(
+            Prefetch(
+                "revisions",
+                queryset=PendingRevision.objects.for_autoreview(wiki.configuration).order_by(
+                    "timestamp", "revid"
+                ),
+            )
+        )
+    )
+    usernames = {
+        revision.user_name
+        for page in pages
+        for revision in page.revisions.all()
+        if revision.user_name
+    }
+    profiles = load_editor_profiles(wiki.pk, usernames)
+    results = run_autoreview_for_pages(pages, profiles, wiki.configuration)
+    return _json_response(
+        {
+            "mode": "dry-run",
+            "pages": [
+                {
+                    "pageid": page.pageid,
+                    "title": page.title,
+                    "results": results[page.pageid],
+                }
+                for page in pages
+            ],
+        }
+    )
+
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def api_clear_cache(request: HttpRequest, pk: int) -> JsonResponse:
     wiki = _get_wiki(pk)
     deleted_pages, _ = PendingPage.objects.filter(wiki=wiki).delete()
-    return JsonResponse({"cleared": deleted_pages})
+    return _json_response({"cleared": deleted_pages})
 
 
 @csrf_exempt
@@ -273,21 +400,29 @@ def api_configuration(request: HttpRequest, pk: int) -> JsonResponse:
     configuration = wiki.configuration
     if request.method == "PUT":
         if request.content_type == "application/json":
-            payload = json.loads(request.body.decode("utf-8")) if request.body else {}
+            payload = _json_body(request) if request.body else {}
+            if payload is None:
+                return _invalid_json_response()
         else:
             payload = request.POST.dict()
-        blocking_categories = payload.get("blocking_categories", [])
-        auto_groups = payload.get("auto_approved_groups", [])
-        if isinstance(blocking_categories, str):
-            blocking_categories = [blocking_categories]
-        if isinstance(auto_groups, str):
-            auto_groups = [auto_groups]
-        configuration.blocking_categories = blocking_categories
-        configuration.auto_approved_groups = auto_groups
-        configuration.save(
-            update_fields=["blocking_categories", "auto_approved_groups", "updated_at"]
-        )
-    return JsonResponse(
+        blocking_categories = _string_list(payload.get("blocking_categories", []))
+        auto_groups = _string_list(payload.get("auto_approved_groups", []))
+        if blocking_categories is None or auto_groups is None:
+            return _json_response(
+                {"error": "Configuration values must be strings or lists of strings."},
+                status=HTTPStatus.BAD_REQUEST,
+            )
+        # The UI saves the whole form at once, so skip the write when nothing changed.
+        if (
+            configuration.blocking_categories != blocking_categories
+            or configuration.auto_approved_groups != auto_groups
+        ):
+            configuration.blocking_categories = blocking_categories
+            configuration.auto_approved_groups = auto_groups
+            configuration.save(
+                update_fields=["blocking_categories", "auto_approved_groups", "updated_at"]
+            )
+    return _json_response(
         {
             "blocking_categories": configuration.blocking_categories,
             "auto_approved_groups": configuration.auto_approved_groups,
@@ -27,6 +27,7 @@ createApp({
     const selectedWikiStorageKey = "selectedWikiId";
     const sortOrderStorageKey = "pendingSortOrder";
     const pageDisplayLimit = 100;
+    const autoreviewBatchSize = 10;
 
     function loadFromStorage(key) {
       if (typeof window === "undefined") {
@@ -379,6 +380,16 @@ createApp({
       state.configurationOpen = !state.configurationOpen;
     }
 
+    function mapReviewResults(results) {
+      const mapping = {};
+      (results || []).forEach((entry) => {
+        if (entry && typeof entry.revid !== "undefined") {
+          mapping[entry.revid] = entry;
+        }
+      });
+      return mapping;
+    }
+
     async function runAutoreview(page) {
       if (!page || !state.selectedWikiId) {
         return;
@@ -392,13 +403,7 @@ createApp({
             method: "POST",
           },
         );
-        const mapping = {};
-        (data.results || []).forEach((entry) => {
-          if (entry && typeof entry.revid !== "undefined") {
-            mapping[entry.revid] = entry;
-          }
-        });
-        setReviewResults(pageId, mapping);
+        setReviewResults(pageId, mapReviewResults(data.results));
       } catch (error) {
         // Errors are surfaced via apiRequest state handling.
       } finally {
@@ -406,6 +411,26 @@ createApp({
       }
     }
 
+    async function runAutoreviewBatch(wikiId, pages) {
+      pages.forEach((page) => setRunning(page.pageid, true));
+      try {
+        const data = await apiRequest(`/api/wikis/${wikiId}/autoreview/`, {
+          method: "POST",
+          headers: {
+            "Content-Type": "application/json",
+          },
+          body: JSON.stringify({ pageids: pages.map((page) => page.pageid) }),
+        });
+        (data.pages || []).forEach((entry) => {
+          setReviewResults(entry.pageid, mapReviewResults(entry.results));
+        });
+      } catch (error) {
+        // Errors are surfaced via apiRequest state handling.
+      } finally {
+        pages.forEach((page) => setRunning(page.pageid, false));
+      }
+    }
+
     async function runAutoreviewAllVisible() {
       if (!state.selectedWikiId || state.runningBulkReview) {
         return;
@@ -415,16 +440,14 @@ createApp({
         return;
       }
       const wikiId = state.selectedWikiId;
+      const queue = pages.filter(Boolean);
       state.runningBulkReview = true;
+
+      // One batch at a time: batches can store fetched wikitext, and concurrent
+      // writers would hit "database is locked" on SQLite.
       try {
-        for (const page of pages) {
-          if (!page) {
-            continue;
-          }
-          if (state.selectedWikiId !== wikiId) {
-            break;
-          }
-          await runAutoreview(page);
+        while (queue.length && state.selectedWikiId === wikiId) {
+          await runAutoreviewBatch(wikiId, queue.splice(0, autoreviewBatchSize));
         }
       } finally {
         state.runningBulkReview = false;